@@ -2,38 +2,67 @@
 
 from tensorflow.keras import layers
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.utils import to_categorical
 from sklearn.base import BaseEstimator, ClassifierMixin
 import numpy as np
 
+from classification_models.keras_input import get_source, fit_model, predict_batches
+
 
 class CNN(BaseEstimator, ClassifierMixin):
     def __init__(self,
                  kernel_size=32,
                  filters=32,
                  optimizer='adam',
-                 epochs=100
+                 epochs=100,
+                 store=None,
+                 keys=None,
+                 batch_size=64,
+                 validation_split=0.1,
+                 patience=5,
+                 verbose=False
                  ):
         self.kernel_size = kernel_size
         self.filters = filters
         self.optimizer = optimizer
         self.epochs = epochs
+        self.store = store
+        self.keys = keys
+        self.batch_size = batch_size
+        self.validation_split = validation_split
+        self.patience = patience
+        self.verbose = verbose
         self.n_features = 1
 
+    def get_source(self, X, role):
+        """
+        Rows the network input is read from (see keras_input.get_source).
+        """
+        return get_source(X, self.store, self.keys, role)
+
+    def get_input(self, rows):
+        """
+        Network input for a batch of rows: the samples or the STFT frames.
+        """
+        if self.store is not None:
+            return np.swapaxes(rows, 1, 2)
+        return rows.reshape((rows.shape[0], rows.shape[1], 1))
+
     def fit(self, X, y=None):
         kernel_size = self.kernel_size
         filters = self.filters
         optimizer = self.optimizer
         epochs = self.epochs
 
-        # Define input shapes
-        self.n_steps = X.shape[1]
+        X = self.get_source(X, "fit")
 
-        X = X.reshape((X.shape[0], X.shape[1], self.n_features))
+        # Define input shapes
+        sample = self.get_input(np.asarray(X[:1]))
+        self.n_steps = sample.shape[1]
+        self.n_features = sample.shape[2]
 
         self.labels, ids = np.unique(y, return_inverse=True)
-        y_cat = to_categorical(ids)
-        num_classes = y_cat.shape[1]
+        ids = ids.astype(np.int32)
+        num_classes = len(self.labels)
 
         self.model = Sequential()
         self.model.add(layers.InputLayer(input_shape=(self.n_steps, self.n_features)))
@@ -46,26 +75,23 @@ class CNN(BaseEstimator, ClassifierMixin):
         self.model.add(layers.Dropout(0.5))
         self.model.add(layers.Dense(num_classes))
         self.model.add(layers.Activation('softmax'))
-        self.model.compile(loss='categorical_crossentropy',
+        self.model.compile(loss='sparse_categorical_crossentropy',
                            optimizer=optimizer,
-                           metrics=["categorical_accuracy"])
-        self.model.fit(X, y_cat, epochs=epochs, verbose=False)
-
-
-
+                           metrics=["sparse_categorical_accuracy"])
+        self.epoch_times_ = fit_model(self.model, X, ids, self.get_input, epochs, self.batch_size,
+                                      self.validation_split, self.patience, self.verbose)
+        return self
 
     def predict_proba(self, X, y=None):
-        X = X.reshape((X.shape[0], X.shape[1], self.n_features))
-        return self.model.predict(X)
+        return predict_batches(self.model, self.get_source(X, "predict"), self.get_input, 4*self.batch_size)
 
     def predict(self, X, y=None):
-        X = X.reshape((X.shape[0], X.shape[1], self.n_features))
-        predictions = self.model.predict(X)
+        predictions = self.predict_proba(X)
         return self.labels[np.argmax(predictions, axis=1)]
 
 
-def instantiate_auto_cnn():
+def instantiate_auto_cnn(store=None, keys=None):
 
-    cnn = CNN()
+    cnn = CNN(store=store, keys=keys)
 
     return cnn
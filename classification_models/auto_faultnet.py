@@ -2,37 +2,39 @@
 
 from tensorflow.keras import layers
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.utils import to_categorical
 from sklearn.base import BaseEstimator, ClassifierMixin
 import tensorflow as tf
+from functools import lru_cache
 import numpy as np
 
+from classification_models.keras_input import get_source, fit_model, predict_batches
 
-def sig_image(data):
 
-    sample_size = len(data[0])
-    xx = 0
-    yy = 0
+@lru_cache(maxsize=None)
+def image_shape(sample_size):
+    """
+    Most square (rows, columns) of powers of two holding sample_size samples.
+    """
+    if sample_size < 4 or sample_size & (sample_size-1) != 0:
+        raise ValueError(f"sig_image needs segments of a power of two (>= 4) samples, got {sample_size}")
+    exponent = sample_size.bit_length() - 1
+    columns = 2**(exponent // 2)
+    return sample_size // columns, columns
 
-    if (sample_size & (sample_size-1) == 0) and sample_size != 0:
-        x = 2
-        y = 2
-        size_aux = 0
-        while xx == 0:
-            while y <= x and xx == 0:
-                size_aux = x * y
-                if size_aux == sample_size:
-                    xx = x
-                    yy = y
-                else:
-                    y = y * 2
-            x = x * 2
-            y = 2
 
-    X=np.zeros((data.shape[0],xx,yy))
-    for i in range(data.shape[0]):
-        X[i]=(data[i,:].reshape(xx,yy))
-    return X.astype(np.float16)
+def sig_image(data, chunk_size=4096):
+    """
+    float16 images (image_shape) of the segments, converted chunk_size at a time.
+    """
+    data = np.asarray(data)
+    shape = (len(data),) + image_shape(data.shape[1])
+    if data.dtype == np.float16:
+        return data.reshape(shape)
+    images = np.empty(shape, dtype=np.float16)
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start+chunk_size]
+        images[start:start+chunk_size] = chunk.reshape((len(chunk),) + shape[1:])
+    return images
 
 
 class CNN(BaseEstimator, ClassifierMixin):
@@ -40,34 +42,58 @@ class CNN(BaseEstimator, ClassifierMixin):
                  kernel_size=32,
                  filters=32,
                  optimizer='adam',
-                 epochs=100
+                 epochs=100,
+                 store=None,
+                 keys=None,
+                 batch_size=64,
+                 validation_split=0.1,
+                 patience=5,
+                 verbose=False
                  ):
         self.kernel_size = kernel_size
         self.filters = filters
         self.optimizer = optimizer
         self.epochs = epochs
+        self.store = store
+        self.keys = keys
+        self.batch_size = batch_size
+        self.validation_split = validation_split
+        self.patience = patience
+        self.verbose = verbose
         self.n_features = 1
 
+    def get_source(self, X, role):
+        """
+        Rows the images are read from (see keras_input.get_source).
+        """
+        return get_source(X, self.store, self.keys, role)
+
+    def get_images(self, rows):
+        """
+        One channel images of a batch of rows (sig_image or STFT magnitudes).
+        """
+        images = rows if self.store is not None else sig_image(rows)
+        return images.reshape(images.shape + (self.n_features,))
+
     def fit(self, X, y=None):
         kernel_size = self.kernel_size
         filters = self.filters
         optimizer = self.optimizer
         epochs = self.epochs
 
-        x_n = sig_image(X)
+        x_n = self.get_source(X, "fit")
 
         # Define input shapes
+        sample = self.get_images(np.asarray(x_n[:1]))
         self.n_samples = x_n.shape[0]
-        self.n_steps_1 = x_n.shape[1]
+        self.n_steps_1 = sample.shape[1]
         #print(self.n_steps_1)
-        self.n_steps_2 = x_n.shape[2]
+        self.n_steps_2 = sample.shape[2]
         #print(self.n_steps_2)
 
-        x_n = x_n.reshape((x_n.shape[0], x_n.shape[1], x_n.shape[2], self.n_features))
-
         self.labels, ids = np.unique(y, return_inverse=True)
-        y_cat = to_categorical(ids)
-        num_classes = y_cat.shape[1]
+        ids = ids.astype(np.int32)
+        num_classes = len(self.labels)
 
         self.model = Sequential()
         self.model.add(layers.InputLayer(input_shape=(self.n_steps_1, self.n_steps_2, self.n_features)))
@@ -82,26 +108,23 @@ class CNN(BaseEstimator, ClassifierMixin):
         self.model.add(layers.Flatten())
         self.model.add(layers.Dense(num_classes))
         self.model.add(layers.Activation('softmax'))
-        self.model.compile(loss='categorical_crossentropy',
+        self.model.compile(loss='sparse_categorical_crossentropy',
                            optimizer=optimizer,
-                           metrics=["categorical_accuracy"])
-        self.model.fit(x_n, y_cat, epochs=epochs, verbose=False)
-
+                           metrics=["sparse_categorical_accuracy"])
+        self.epoch_times_ = fit_model(self.model, x_n, ids, self.get_images, epochs, self.batch_size,
+                                      self.validation_split, self.patience, self.verbose)
+        return self
 
     def predict_proba(self, X, y=None):
-        X = sig_image(X)
-        X = X.reshape((X.shape[0], X.shape[1], X.shape[2], self.n_features))
-        return self.model.predict(X)
+        return predict_batches(self.model, self.get_source(X, "predict"), self.get_images, 4*self.batch_size)
 
     def predict(self, X, y=None):
-        X = sig_image(X)
-        X = X.reshape((X.shape[0], X.shape[1], X.shape[2], self.n_features))
-        predictions = self.model.predict(X)
+        predictions = self.predict_proba(X)
         return self.labels[np.argmax(predictions, axis=1)]
 
 
-def instantiate_auto_cnn():
+def instantiate_auto_cnn(store=None, keys=None):
 
-    cnn = CNN()
+    cnn = CNN(store=store, keys=keys)
 
     return cnn
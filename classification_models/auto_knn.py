@@ -6,18 +6,22 @@ from sklearn.model_selection import GridSearchCV
 from features_extractors.heterogeneous import Heterogeneous
 from sklearn.neighbors import KNeighborsClassifier
 from features_extractors.statisticaltime import StatisticalTime
+from features_extractors.cached import CachedTransformer
+from features_extractors.parallel import ParallelTransformer
+from classification_models.search import HalvingSearch
 
 
-def instantiate_auto_knn():
+def instantiate_auto_knn(n_jobs=None, search=False, budget=None):
 
     knn = Pipeline([
-                    ('FeatureExtraction', StatisticalTime()),
+                    ('FeatureExtraction', CachedTransformer(ParallelTransformer(StatisticalTime(), n_jobs=n_jobs))),
                     ('scaler', StandardScaler()),
                     ('knn', KNeighborsClassifier()),
                     ])
 
-    #parameters_knn = {'knn__n_neighbors': [1, 5, 9]}
+    if search:
+        parameters_knn = {'knn__n_neighbors': [1, 5, 9]}
 
-    #knn = GridSearchCV(knn, parameters_knn)
+        knn = HalvingSearch(knn, parameters_knn, budget=budget, n_jobs=n_jobs)
 
     return knn
@@ -6,19 +6,23 @@ from sklearn.model_selection import GridSearchCV
 from features_extractors.heterogeneous import Heterogeneous
 from sklearn.linear_model import LogisticRegression
 from features_extractors.statisticaltime import StatisticalTime
+from features_extractors.cached import CachedTransformer
+from features_extractors.parallel import ParallelTransformer
+from classification_models.search import HalvingSearch
 
 
 
-def instantiate_auto_lr():
+def instantiate_auto_lr(n_jobs=None, search=False, budget=None):
 
     lr = Pipeline([
-                    ('FeatureExtraction', StatisticalTime()),
+                    ('FeatureExtraction', CachedTransformer(ParallelTransformer(StatisticalTime(), n_jobs=n_jobs))),
                     ('scaler', StandardScaler()),
                     ('lr', LogisticRegression(max_iter=10000)),
                     ])
 
-    #parameters_lr = {'lr__C': [0.1, 0.5, 1]}
+    if search:
+        parameters_lr = {'lr__C': [0.1, 0.5, 1]}
 
-    #lr = GridSearchCV(lr, parameters_lr)
+        lr = HalvingSearch(lr, parameters_lr, budget=budget, n_jobs=n_jobs)
 
     return lr
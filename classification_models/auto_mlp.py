@@ -4,13 +4,15 @@ from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import GridSearchCV
 from features_extractors.heterogeneous import Heterogeneous
+from features_extractors.cached import CachedTransformer
+from features_extractors.parallel import ParallelTransformer
 from sklearn.neural_network import MLPClassifier
 
 
-def instantiate_auto_mlp():
+def instantiate_auto_mlp(n_jobs=None):
 
     mlp = Pipeline([
-                    ('FeatureExtraction', Heterogeneous()),
+                    ('FeatureExtraction', CachedTransformer(ParallelTransformer(Heterogeneous(), n_jobs=n_jobs))),
                     ('scaler', StandardScaler()),
                     ('mlp', MLPClassifier(max_iter=500)),
                     ])
@@ -6,21 +6,25 @@ from sklearn.model_selection import GridSearchCV
 from sklearn.ensemble import RandomForestClassifier
 from features_extractors.heterogeneous import Heterogeneous
 from features_extractors.statisticaltime import StatisticalTime
+from features_extractors.cached import CachedTransformer
+from features_extractors.parallel import ParallelTransformer
+from classification_models.search import HalvingSearch
 
 
-def instantiate_auto_random_forest():
+def instantiate_auto_random_forest(n_jobs=None, search=False, budget=None):
 
     rf = Pipeline([
-        ('FeatureExtraction', StatisticalTime()),
+        ('FeatureExtraction', CachedTransformer(ParallelTransformer(StatisticalTime(), n_jobs=n_jobs))),
         ('scaler', StandardScaler()),
         ('rf', RandomForestClassifier()),
     ])
 
-    #parameters_rf = {
-    #    "rf__max_features": [1, 2, 5, 7, 10],
-    #    "rf__n_estimators": [50, 100, 200],
-    #}
+    if search:
+        parameters_rf = {
+            "rf__max_features": [1, 2, 5, 7, 10],
+            "rf__n_estimators": [50, 100, 200],
+        }
 
-    #rf = GridSearchCV(rf, parameters_rf)
+        rf = HalvingSearch(rf, parameters_rf, budget=budget, n_jobs=n_jobs)
 
     return rf
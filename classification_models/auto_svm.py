@@ -4,6 +4,8 @@ from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import GridSearchCV
 from features_extractors.heterogeneous import Heterogeneous
+from features_extractors.cached import CachedTransformer
+from features_extractors.parallel import ParallelTransformer
 from sklearn.svm import SVC
 from sklearn.base import BaseEstimator, ClassifierMixin
 
@@ -22,10 +24,10 @@ class SVM(BaseEstimator, ClassifierMixin):
         return self.svm.predict(X)
 
 
-def instantiate_auto_svm():
+def instantiate_auto_svm(n_jobs=None):
 
     svm = Pipeline([
-                    ('FeatureExtraction', Heterogeneous()),
+                    ('FeatureExtraction', CachedTransformer(ParallelTransformer(Heterogeneous(), n_jobs=n_jobs))),
                     ('scaler', StandardScaler()),
                     #('svm', SVC(probability="True")),
                     ('svm', SVM()),
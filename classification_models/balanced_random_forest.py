@@ -4,11 +4,13 @@ from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from imblearn.ensemble import BalancedRandomForestClassifier
 from features_extractors.statisticaltime import StatisticalTime
+from features_extractors.cached import CachedTransformer
+from features_extractors.parallel import ParallelTransformer
 
 
-def instantiate_balanced_random_forest():
+def instantiate_balanced_random_forest(n_jobs=None):
     model = Pipeline([
-        ('FeatureExtraction', StatisticalTime()),
+        ('FeatureExtraction', CachedTransformer(ParallelTransformer(StatisticalTime(), n_jobs=n_jobs))),
         ('scaler', StandardScaler()),
         ('rf', BalancedRandomForestClassifier(sampling_strategy='all', replacement=True)),
     ])
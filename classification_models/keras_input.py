@@ -0,0 +1,105 @@
+# Input pipelines and callbacks shared by the Keras models
+
+from sklearn.model_selection import train_test_split
+import tensorflow as tf
+import numpy as np
+import time
+
+
+def get_source(X, store=None, keys=None, role=None):
+    """
+    Rows a network reads its input from, a batch at a time: the segments X
+    or, with a SpectrogramStore, their STFT magnitudes memory mapped from the
+    store. keys optionally names the segments of each role in the store, e.g.
+    {"fit": "cwru_...", "predict": "hust_..."}.
+    """
+    if store is not None:
+        return store.transform(X, None if keys is None else keys.get(role))
+    return X
+
+
+def make_dataset(X, prepare, y=None, indices=None, batch_size=64, shuffle=False, seed=0):
+    """
+    Prefetched tf.data pipeline of the rows indices of X, read batch_size at
+    a time and converted by prepare; y holds integer labels.
+    """
+    indices = np.arange(len(X)) if indices is None else np.asarray(indices)
+    rng = np.random.default_rng(seed)
+
+    def batches():
+        order = rng.permutation(indices) if shuffle else indices
+        for start in range(0, len(order), batch_size):
+            # Sorted indices read a memory map sequentially.
+            batch = np.sort(order[start:start + batch_size])
+            inputs = prepare(np.asarray(X[batch]))
+            if y is None:
+                yield inputs
+            else:
+                yield inputs, y[batch]
+
+    sample = prepare(np.asarray(X[indices[:1]]))
+    input_spec = tf.TensorSpec(shape=(None,) + sample.shape[1:], dtype=tf.as_dtype(sample.dtype))
+    if y is None:
+        signature = input_spec
+    else:
+        signature = (input_spec, tf.TensorSpec(shape=(None,), dtype=tf.as_dtype(y.dtype)))
+    return tf.data.Dataset.from_generator(batches, output_signature=signature).prefetch(tf.data.AUTOTUNE)
+
+
+def split_validation(y, validation_split, seed=0):
+    """
+    Training and validation indices, stratified by label when possible.
+    """
+    indices = np.arange(len(y))
+    n_validation = int(len(y) * validation_split)
+    if n_validation < len(np.unique(y)):
+        return indices, indices[:0]
+    try:
+        return train_test_split(indices, test_size=n_validation, stratify=y, random_state=seed)
+    except ValueError:
+        return train_test_split(indices, test_size=n_validation, random_state=seed)
+
+
+class EpochTimer(tf.keras.callbacks.Callback):
+    """
+    Records the wall time of every epoch.
+    """
+
+    def __init__(self, verbose=False):
+        super().__init__()
+        self.verbose = verbose
+        self.times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.start_time = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.times.append(time.perf_counter() - self.start_time)
+        if self.verbose:
+            metrics = ", ".join(f"{name}: {value:.4f}" for name, value in (logs or {}).items())
+            print(f"epoch {epoch + 1}: {self.times[-1]:.2f} s, {metrics}")
+
+
+def fit_model(model, X, ids, prepare, epochs, batch_size=64, validation_split=0.1, patience=5, verbose=False):
+    """
+    Trains model on lazily read batches, with early stopping on the
+    validation loss. Returns the wall time of each epoch.
+    """
+    train, validation = split_validation(ids, validation_split)
+    timer = EpochTimer(verbose)
+    callbacks = [timer]
+    validation_data = None
+    if len(validation) > 0:
+        validation_data = make_dataset(X, prepare, ids, validation, batch_size)
+        callbacks.append(tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=patience,
+                                                          restore_best_weights=True))
+    model.fit(make_dataset(X, prepare, ids, train, batch_size, shuffle=True),
+              validation_data=validation_data, epochs=epochs, callbacks=callbacks, verbose=False)
+    return timer.times
+
+
+def predict_batches(model, X, prepare, batch_size=256):
+    """
+    Class probabilities of the rows of X, predicted in batches.
+    """
+    return model.predict(make_dataset(X, prepare, batch_size=batch_size), verbose=False)
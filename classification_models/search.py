@@ -0,0 +1,165 @@
+# Successive halving search
+
+from multiprocessing import Pool
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, cross_val_score
+from sklearn.pipeline import Pipeline
+import numpy as np
+import math
+import time
+
+from datasets.models.parallel import get_n_workers
+
+
+def score_candidate(estimator, params, X, y, cv):
+    """
+    Mean cross-validation score of estimator with params, and the time it took.
+    """
+    start_time = time.perf_counter()
+    estimator = clone(estimator).set_params(**params)
+    score = np.mean(cross_val_score(estimator, X, y, cv=cv))
+    return score, time.perf_counter() - start_time
+
+
+def stratified_subset(orders, fraction, min_per_class):
+    """
+    Sorted indices of fraction of the segments of each class, and at least
+    min_per_class of each (or all of a smaller class). orders holds a random
+    permutation of the indices of each class; taking their first indices
+    makes the subsets of growing fractions nested.
+    """
+    return np.sort(np.concatenate([order[:max(min_per_class, math.ceil(fraction * len(order)))]
+                                   for order in orders]))
+
+
+class HalvingSearch(BaseEstimator, ClassifierMixin):
+    """
+    Successive halving search over param_grid, the parameters of the steps
+    after the feature extraction of a pipeline, under a wall-clock budget.
+
+    The first step of the pipeline (the feature extraction, which learns
+    nothing in fit) transforms the training segments once. The candidates
+    are then cross-validated on the features of a growing random subset of
+    the segments, stratified by class with at least 2*cv segments of each
+    class: each round keeps the best 1/factor of the candidates and
+    multiplies the subset size by factor, up to all the segments in the
+    last round. The candidates of a round run in
+    a pool of n_jobs processes. When budget seconds have passed, the
+    workers still running candidates are terminated and the search stops
+    with the best candidate of the last round that finished. The best
+    pipeline is then fitted on all the segments; this refit is not counted
+    against the budget (its time is in refit_time_).
+
+    Attributes
+    ----------
+    best_params_, best_score_, best_estimator_
+      parameters, cross-validation score and fitted pipeline of the winner
+    candidates_ : list
+      one dict per candidate and round: params, round, n_samples, score
+      and time (seconds spent cross-validating)
+    search_time_, refit_time_ : float
+      seconds spent in the rounds and in the final refit
+    """
+
+    def __init__(self, pipeline, param_grid, budget=None, factor=3, cv=3, n_jobs=None,
+                 random_state=0, verbose=True):
+        self.pipeline = pipeline
+        self.param_grid = param_grid
+        self.budget = budget
+        self.factor = factor
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def run_round(self, estimator, candidates, X, y, deadline):
+        """
+        Scores the candidates until the deadline. Returns {index: (score, time)}
+        for the candidates that finished.
+        """
+        cv = StratifiedKFold(self.cv)
+        results = {}
+        n_workers = min(get_n_workers(self.n_jobs), len(candidates))
+        if n_workers <= 1:
+            for index, params in enumerate(candidates):
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                results[index] = score_candidate(estimator, params, X, y, cv)
+            return results
+
+        pool = Pool(n_workers)
+        try:
+            pending = {index: pool.apply_async(score_candidate, (estimator, params, X, y, cv))
+                       for index, params in enumerate(candidates)}
+            while pending:
+                for index in [index for index, result in pending.items() if result.ready()]:
+                    results[index] = pending.pop(index).get()
+                if not pending or (deadline is not None and time.perf_counter() > deadline):
+                    break
+                timeout = 0.1 if deadline is None else min(max(deadline - time.perf_counter(), 0), 0.1)
+                next(iter(pending.values())).wait(timeout)
+        finally:
+            # Candidates past the deadline are killed, so they do not keep
+            # the CPUs busy during the next rounds and the refit.
+            pool.terminate()
+            pool.join()
+        return results
+
+    def fit(self, X, y):
+        start_time = time.perf_counter()
+        deadline = None if self.budget is None else start_time + self.budget
+        y = np.asarray(y)
+
+        extraction = self.pipeline.steps[0][1]
+        features = extraction.fit_transform(X, y)
+        estimator = Pipeline(self.pipeline.steps[1:])
+
+        candidates = list(ParameterGrid(self.param_grid))
+        n_rounds = max(math.ceil(math.log(len(candidates), self.factor)), 0) + 1
+        rng = np.random.default_rng(self.random_state)
+        orders = [rng.permutation(np.flatnonzero(y == label)) for label in np.unique(y)]
+
+        self.candidates_ = []
+        ranking = [(None, params) for params in candidates]
+        for round_index in range(n_rounds):
+            subset = stratified_subset(orders, float(self.factor)**(round_index - n_rounds + 1), 2 * self.cv)
+            n_samples = len(subset)
+            params_list = [params for _, params in ranking]
+            results = self.run_round(estimator, params_list, features[subset], y[subset], deadline)
+            for index, (score, run_time) in results.items():
+                self.candidates_.append({"params": params_list[index], "round": round_index,
+                                         "n_samples": n_samples, "score": score, "time": run_time})
+            if not results:
+                break
+            ranking = sorted(((results[index][0], params_list[index]) for index in results),
+                             key=lambda candidate: -candidate[0])
+            if len(ranking) == 1 or (deadline is not None and time.perf_counter() > deadline):
+                break
+            ranking = ranking[:max(math.ceil(len(ranking) / self.factor), 1)]
+
+        self.best_score_, self.best_params_ = ranking[0]
+        if self.best_score_ is None:
+            # Not even the first round finished in the budget.
+            self.best_params_ = candidates[0]
+        self.search_time_ = time.perf_counter() - start_time
+        refit_start = time.perf_counter()
+        self.best_estimator_ = clone(self.pipeline).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y)
+        self.refit_time_ = time.perf_counter() - refit_start
+        if self.verbose:
+            self.report()
+        return self
+
+    def report(self):
+        print(f"Search: {len(self.candidates_)} candidate runs in {self.search_time_:.2f} s, "
+              f"refit in {self.refit_time_:.2f} s")
+        for candidate in self.candidates_:
+            print(f"  round {candidate['round']} ({candidate['n_samples']} samples) {candidate['params']}: "
+                  f"score {candidate['score']:.4f}, {candidate['time']:.2f} s")
+        print(f"Best: {self.best_params_} (score {self.best_score_})")
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
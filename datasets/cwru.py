@@ -10,6 +10,9 @@ import csv
 import urllib
 import sys
 
+from datasets.models.dataset_base import CodedLabels
+from datasets.models.mat_index import MatIndex
+
 # Code to avoid incomplete array results
 np.set_printoptions(threshold=sys.maxsize)
 
@@ -40,7 +43,7 @@ def download_file(url, dirname, bearing):
         download_file(url, dirname, bearing)
 
 
-class CWRU():
+class CWRU(CodedLabels):
     """
     CWRU class wrapper for database download and acquisition.
 
@@ -78,7 +81,7 @@ class CWRU():
 
         return bearing_label, bearing_file_names
 
-    def __init__(self, bearing_names_file="cwru_bearings.csv"):
+    def __init__(self, bearing_names_file="cwru_bearings.csv", dtype=np.float32):
         self.rawfilesdir = "cwru_raw"
         #self.url = "http://csegroups.case.edu/sites/default/files/bearingdatacenter/files/Datafiles/"
         self.url = "https://engineering.case.edu/sites/default/files/"
@@ -87,9 +90,8 @@ class CWRU():
         self.bearing_labels, self.bearing_names = self.get_bearings()
 
         self.n_channels = 2
-        self.signal_data = np.empty((0, self.sample_size, self.n_channels))
-        self.labels = []
-        self.keys = []
+        self.set_dtype(dtype)
+        self.signal_data = np.empty((0, self.sample_size, self.n_channels), dtype=self.dtype)
 
         """
         Associate each file name to a bearing condition in a Python dictionary. 
@@ -137,33 +139,46 @@ class CWRU():
 
         print("Dataset Loaded.")
 
+    def get_source_sample_rate(self, key):
+        """
+        The normal baseline files were recorded at 48 kHz, the fault files at 12 kHz.
+        """
+        return 48000 if key[0] == "N" else 12000
+
+    def read_file(self, path, array_keys):
+        matlab_file = scipy.io.loadmat(path, variable_names=array_keys)
+        acquisition = [matlab_file[array_key].reshape(1, -1)[0] for array_key in array_keys]
+        return [np.array(acquisition).T]
+
     def load_acquisitions(self):
         """
-        Extracts the acquisitions of each file in the dictionary files_names.
+        Extracts the acquisitions of each file in the dictionary files_names,
+        at the target sample rate (see set_sample_rate).
         """
         cwd = os.getcwd()
+        mat_index = MatIndex(os.path.join(self.rawfilesdir, "mat_index.json"))
 
+        recordings = []
         for key in self.files:
-            matlab_file = scipy.io.loadmat(os.path.join(cwd, self.files[key]))
-            acquisition = []
+            path = os.path.join(cwd, self.files[key])
+            variables = mat_index.variables(path)
+            array_keys = []
             positions = ['DE', 'FE', 'BA']
             for position in positions[:self.n_channels]:
-                keys = [k for k in matlab_file if k.endswith(position + "_time")]
+                keys = [k for k in variables if k.endswith(position + "_time")]
                 if len(keys) > 0:
-                    array_key = keys[0]
-                    acquisition.append(matlab_file[array_key].reshape(1, -1)[0])
-            if len(acquisition) < self.n_channels:
-                # print('escaping', key, len(acquisition))
+                    array_keys.append(keys[0])
+            if len(array_keys) < self.n_channels:
+                # print('escaping', key, len(array_keys))
                 continue
-            acquisition = np.array(acquisition).T
-            for i in range(acquisition.shape[0]//self.sample_size):
-                sample = acquisition[(i * self.sample_size):((i + 1) * self.sample_size),:]
-                self.signal_data = np.append(self.signal_data, np.array([sample]), axis=0)
-                self.labels = np.append(self.labels, key[0])
-                self.keys = np.append(self.keys, key)
+            acquisition = self.read_resampled(key, path, lambda: self.read_file(path, array_keys))[0]
+            recordings.append((acquisition, key[0], key))
+        mat_index.save()
+
+        self.segment(recordings)
      
     
     def get_acquisitions(self):
-        if len(self.labels)==0:
+        if len(self.label_codes)==0:
             self.load_acquisitions()
         return self.signal_data, self.labels
\ No newline at end of file
@@ -15,6 +15,8 @@ import requests
 # Unpack Tools
 from pyunpack import Archive
 
+from datasets.models.dataset_base import CodedLabels
+
 # Code to avoid incomplete array results
 np.set_printoptions(threshold=sys.maxsize)
 
@@ -67,7 +69,7 @@ def extract_zip(dirname, zip_name):
         extract_zip(dirname, zip_name)
 
 
-class MFPT():
+class MFPT(CodedLabels):
     """
     MFPT class wrapper for database download and acquisition.
 
@@ -90,14 +92,13 @@ class MFPT():
     load_acquisitions()
       Extract data from files
     """
-    def __init__(self):
+    def __init__(self, dtype=np.float32):
         self.rawfilesdir = "mfpt_raw"
         self.url="https://mfpt.org/wp-content/uploads/2020/02/MFPT-Fault-Data-Sets-20200227T131140Z-001.zip"
         self.sample_size = 4096
 
-        self.signal_data = np.empty((0, self.sample_size))
-        self.labels = []
-        self.keys = []
+        self.set_dtype(dtype)
+        self.signal_data = np.empty((0, self.sample_size), dtype=self.dtype)
 
         """
         The MFPT dataset is divided into 3 kinds of states: normal state, inner race
@@ -157,27 +158,36 @@ class MFPT():
 
         print("Dataset Loaded.")
 
+    def get_source_sample_rate(self, key):
+        """
+        The baseline files were recorded at 97656 Hz, the others at 48828 Hz.
+        """
+        return 97656 if len(key) == 8 else 48828
+
+    def read_file(self, key):
+        matlab_file = scipy.io.loadmat(self.files[key], variable_names=['bearing'])
+
+        if len(key) == 8:
+            vibration_data_raw = matlab_file['bearing'][0][0][1]
+        else:
+            vibration_data_raw = matlab_file['bearing'][0][0][2]
+
+        return [np.ravel(vibration_data_raw)]
+
     def load_acquisitions(self):
         """
-        Extracts the acquisitions of each file in the dictionary files_names.
+        Extracts the acquisitions of each file in the dictionary files_names,
+        at the target sample rate (see set_sample_rate).
         """
+        recordings = []
         for key in self.files:
-            matlab_file = scipy.io.loadmat(self.files[key])
-
-            if len(key) == 8:
-                vibration_data_raw = matlab_file['bearing'][0][0][1]
-            else:
-                vibration_data_raw = matlab_file['bearing'][0][0][2]
+            vibration_data = self.read_resampled(key, self.files[key], lambda: self.read_file(key))[0]
+            recordings.append((vibration_data, key[0], key))
 
-            vibration_data = np.array([ elem for singleList in vibration_data_raw for elem in singleList])
-            for i in range(len(vibration_data)//self.sample_size):
-                sample = vibration_data[(i * self.sample_size):((i + 1) * self.sample_size)]
-                self.signal_data = np.append(self.signal_data, np.array([sample]), axis=0)
-                self.labels = np.append(self.labels, key[0])
-                self.keys = np.append(self.keys, key)
+        self.segment(recordings)
 
         
     def get_acquisitions(self):
-        if len(self.labels)==0:
+        if len(self.label_codes)==0:
             self.load_acquisitions()
         return self.signal_data, self.labels
\ No newline at end of file
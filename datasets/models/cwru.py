@@ -8,6 +8,15 @@ from ..rolbearing_dataset.download import download_dataset
 from utils.regex_util import extract_groups_from_words
 
 class CWRU(DatasetBase):
+
+    _source_sample_rate = 12000
+
+    # Defect frequencies of the drive end (SKF 6205-2RS JEM) and fan end
+    # (SKF 6203-2RS JEM) bearings as multiples of the shaft speed, and the
+    # shaft speed (rpm) at each motor load (hp), as published with the data.
+    _defect_multiples = {"DE": {"BPFI": 5.4152, "BPFO": 3.5848, "FTF": 0.39828, "BSF": 4.7135},
+                         "FE": {"BPFI": 4.9469, "BPFO": 3.0530, "FTF": 0.3817, "BSF": 3.9874}}
+    _shaft_speeds = {"0": 1797, "1": 1772, "2": 1750, "3": 1730}
     
     def __init__(self):
         self._url = "https://engineering.case.edu/sites/default/files/"
@@ -24,24 +33,56 @@ class CWRU(DatasetBase):
         download_dataset(url, dirname, metadata_path=metadata)
 
     
-    def load_acquisitions(self, fault_type=None, sensor_position=None, bearing_type=None):
+    def parse_key(self, key):
+        """
+        Keys look like "O.007.DE.@6_0,130.mat": the fault, its size and
+        position, followed by the motor load.
+        """
+        bearing, load = key.split(',')[0].rsplit('_', 1)
+        return {"label": key[0], "fault_element": key[0], "load": load, "bearing": bearing}
+
+
+    def get_file_defect_frequencies(self, key):
+        """
+        Defect frequencies, in Hz, of the bearing at the fault position of the
+        file of key (the drive end for normal files), at the shaft speed of
+        its motor load.
+        """
+        fields = self.parse_key(key)
+        position = "FE" if ".FE" in fields["bearing"] else "DE"
+        shaft_frequency = self._shaft_speeds[fields["load"]] / 60
+        return {name: multiple * shaft_frequency for name, multiple in self._defect_multiples[position].items()}
+
+
+    def get_defect_frequencies(self):
+        """
+        The defect frequencies of the files of the metadata when they all
+        share the bearing position and the load (e.g. a metadata file with
+        only the drive end faults at 0 hp), otherwise empty.
+        """
+        frequencies = [self.get_file_defect_frequencies(key) for key in self.get_metadata().keys]
+        if frequencies and all(frequency == frequencies[0] for frequency in frequencies):
+            return frequencies[0]
+        return {}
+
+
+    def get_source_sample_rate(self, key):
+        """
+        The normal baseline files were recorded at 48 kHz; the drive end and
+        fan end fault files listed in the metadata at 12 kHz.
+        """
+        return 48000 if key[0] == "N" else self._source_sample_rate
+
+
+    def read_file(self, key, path):
 
         pattern = re.compile(r'([A-Z0-9]+_([A-Z]+)_time)')
-               
-        self._files_path = self.get_files_path()
-        
-        for key in self._files_path:
-            path = self._files_path[key] 
-            
-            matlab_file = scipy.io.loadmat(path)           
-            k = matlab_file.keys()
-            
-            cols = [word[0] for word in extract_groups_from_words(k, pattern)]
-            # sensor_position = [word[1] for word in extract_groups_from_words(k, pattern)]
-            
-            for col in cols:
-                data = matlab_file[col].reshape(1, -1)[0][:self._sample_size]
-                self._labels = np.append(self._labels, key[0])
-                self._signal_data = np.vstack((self._signal_data, data))
-                self._keys = np.append(self._keys, key)  
-           
\ No newline at end of file
+
+        k = self.get_mat_index().variables(path).keys()
+
+        cols = [word[0] for word in extract_groups_from_words(k, pattern)]
+        # sensor_position = [word[1] for word in extract_groups_from_words(k, pattern)]
+
+        matlab_file = scipy.io.loadmat(path, variable_names=cols)
+
+        return [matlab_file[col].reshape(1, -1)[0] for col in cols]
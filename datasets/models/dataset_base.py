@@ -1,12 +1,226 @@
 from abc import ABC, abstractmethod
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import hashlib
 import os
 import csv
 
+from .parallel import read_files
+from .mat_index import MatIndex
+from .metadata import MetadataTable, encode
+from .resampling import ResampleCache
+from .storage import save_array
+
+
+def count_windows(length, window_size, hop=None, max_windows=None):
+    """
+    Number of windows of window_size samples, taken every hop samples, that
+    fit in a recording of the given length. By default the windows do not
+    overlap (hop = window_size).
+    """
+    hop = hop or window_size
+    n_windows = (length - window_size) // hop + 1 if length >= window_size else 0
+    if max_windows is not None:
+        n_windows = min(n_windows, max_windows)
+    return n_windows
+
+
+def window_view(signal, window_size, hop=None, max_windows=None):
+    """
+    Windows of a recording as a read-only view of shape
+    (n_windows, window_size) or (n_windows, window_size, channels).
+    No samples are copied, so overlapping windows cost no extra memory
+    until a contiguous copy is requested.
+    """
+    hop = hop or window_size
+    signal = np.asarray(signal)
+    n_windows = count_windows(len(signal), window_size, hop, max_windows)
+    if n_windows == 0:
+        return np.empty((0, window_size) + signal.shape[1:], dtype=signal.dtype)
+
+    signal = signal[:(n_windows - 1) * hop + window_size]
+    windows = sliding_window_view(signal, window_size, axis=0)[::hop]
+    # sliding_window_view puts the window axis last, after the channels.
+    return np.moveaxis(windows, -1, 1)
+
+
+def quantization_scale(signals, dtype):
+    """
+    Scale factor that maps the signals to the integer dtype: stored values
+    are round(signal / scale). Signals that already are integers, and float
+    dtypes, keep a scale of 1.
+    """
+    if not np.issubdtype(dtype, np.integer):
+        return 1.0
+    signals = [np.asarray(signal) for signal in signals]
+    if all(np.issubdtype(signal.dtype, np.integer) for signal in signals):
+        return 1.0
+    peak = max((np.max(np.abs(signal)) for signal in signals if signal.size), default=0.0)
+    return float(peak) / np.iinfo(dtype).max if peak > 0 else 1.0
+
+
+def segment_recordings(recordings, sample_size, max_segments=None, dtype=np.float64, hop=None, scale=1.0):
+    """
+    Cuts each recording into windows and writes them into arrays that are
+    allocated only once.
+
+    Parameters
+    ----------
+    recordings : list
+      (signal, label, key) tuples, where signal has shape (length,) or
+      (length, channels)
+    sample_size : int
+      number of samples of each segment
+    max_segments : int, optional
+      maximum number of segments taken from each recording
+    hop : int, optional
+      distance between the starts of consecutive segments, sample_size by default
+    dtype, scale : optional
+      storage dtype of the segments; integer dtypes store round(signal / scale)
+      and raise a ValueError for values out of the range of the dtype
+
+    Returns
+    -------
+    signal_data, labels, keys
+      arrays with one row per segment
+    """
+    counts = [count_windows(len(signal), sample_size, hop, max_segments) for signal, _, _ in recordings]
+    total = sum(counts)
+    channels = np.shape(recordings[0][0])[1:] if recordings else ()
+
+    integer = np.issubdtype(dtype, np.integer)
+    quantize = integer and scale != 1.0
+    signal_data = np.empty((total, sample_size) + channels, dtype=dtype)
+    row = 0
+    for (signal, _, _), n_segments in zip(recordings, counts):
+        windows = window_view(signal, sample_size, hop, n_segments)
+        if quantize:
+            windows = np.rint(windows / scale)
+        if integer and windows.size:
+            info = np.iinfo(dtype)
+            if np.min(windows) < info.min or np.max(windows) > info.max:
+                raise ValueError(f"Segments out of the range of {np.dtype(dtype)} with scale {scale}; "
+                                 f"use a larger scale or let set_dtype derive it.")
+        signal_data[row:row + n_segments] = windows
+        row += n_segments
+
+    labels = np.repeat(np.array([label for _, label, _ in recordings]), counts)
+    keys = np.repeat(np.array([key for _, _, key in recordings]), counts)
+    return signal_data, labels, keys
+
+
+def encode_recordings(recordings):
+    """
+    Replaces the labels and keys of (signal, label, key) recordings by int32
+    codes. Returns the coded recordings and the label and key vocabularies.
+    """
+    label_codes, label_vocabulary = encode([label for _, label, _ in recordings])
+    key_codes, key_vocabulary = encode([key for _, _, key in recordings])
+    coded = [(signal, label_code, key_code)
+             for (signal, _, _), label_code, key_code in zip(recordings, label_codes, key_codes)]
+    return coded, label_vocabulary, key_vocabulary
+
+
+class CodedLabels():
+    """
+    Mixin for the loaders outside DatasetBase that keep int32 label_codes
+    and key_codes per segment, decoding labels and keys only on access.
+    """
+
+    label_codes = np.empty(0, dtype=np.int32)
+    key_codes = np.empty(0, dtype=np.int32)
+    label_vocabulary = np.empty(0, dtype=str)
+    key_vocabulary = np.empty(0, dtype=str)
+    scale = 1.0
+    target_rate = None
+    resample_method = 'polyphase'
+
+    @property
+    def labels(self):
+        return self.label_vocabulary[self.label_codes]
+
+    @property
+    def keys(self):
+        return self.key_vocabulary[self.key_codes]
+
+    def get_coded_acquisitions(self):
+        """
+        Returns the segments, the int32 code of the label of each segment and
+        the label vocabulary the codes index.
+        """
+        if len(self.label_codes)==0:
+            self.load_acquisitions()
+        return self.signal_data, self.label_codes, self.label_vocabulary
+
+    def get_scale(self):
+        """
+        Factor that converts the stored segments back to the source units.
+        """
+        return self.scale
+
+    def set_dtype(self, dtype):
+        """
+        Storage dtype of the segments; integer dtypes store round(signal / scale).
+        """
+        self.dtype = np.dtype(dtype)
+
+    def set_sample_rate(self, sample_rate, method='polyphase'):
+        """
+        Target sample rate, in Hz, of the segments (None keeps the native
+        rate of each file); see resampling.resample. Clears the segments.
+        """
+        self.target_rate = sample_rate
+        self.resample_method = method
+        self.label_codes = np.empty(0, dtype=np.int32)
+        self.signal_data = self.signal_data[:0]
+
+    def get_source_sample_rate(self, key):
+        """
+        Native sample rate, in Hz, of the file of the given key.
+        """
+        raise NotImplementedError(f"The sample rate of {type(self).__name__} files is unknown.")
+
+    def read_resampled(self, key, path, read):
+        """
+        Signals of one file at the target sample rate, stacked along axis 0;
+        read() decodes them at the native rate. Resampled signals are cached
+        in rawfilesdir/resampled (see DatasetBase.read_signals).
+        """
+        source_rate = None if self.target_rate is None else self.get_source_sample_rate(key)
+        if source_rate is None or source_rate == self.target_rate:
+            return np.stack(read())
+        cache = ResampleCache(os.path.join(self.rawfilesdir, "resampled"), self.resample_method)
+        stat = os.stat(path)
+        identity = f"{key},{stat.st_size},{stat.st_mtime_ns}"
+        signals = cache.load(identity, source_rate, self.target_rate)
+        if signals is None:
+            signals = cache.resample([identity], [read()], source_rate, self.target_rate)[0]
+        return signals
+
+    def segment(self, recordings, max_segments=None):
+        """
+        Codes the labels and keys of (signal, label, key) recordings and cuts
+        them into segments of sample_size samples, stored as dtype.
+        """
+        coded, self.label_vocabulary, self.key_vocabulary = encode_recordings(recordings)
+        self.scale = quantization_scale([signal for signal, _, _ in coded], self.dtype)
+        self.signal_data, self.label_codes, self.key_codes = segment_recordings(
+            coded, self.sample_size, max_segments, self.dtype, scale=self.scale)
+
 
 class DatasetBase(ABC):
 
+    # Bump whenever read_file or the segmentation changes the decoded output,
+    # so that segments cached by older versions are not reused.
+    _loader_version = 4
+
+    # Native sample rate of the recordings, in Hz (see get_source_sample_rate).
+    _source_sample_rate = None
+
+    # Bearing defect frequencies, in Hz, by name (see get_defect_frequencies).
+    _defect_frequencies = {}
+
     def __init__(self):
         self._url: str
         self._name = self.__class__.__name__.lower()
@@ -15,15 +229,28 @@ class DatasetBase(ABC):
         self._raw_data_dir = os.path.join(self._dataset_dir, f"{self._name}_raw")
         
         self._metadata_path = os.path.join(self._dataset_dir, f"{self._name}_bearings.csv")
+        self._cache_dir = os.path.join(self._dataset_dir, "cache")
         zip_file_path = os.path.join(self._dataset_dir, f"{self._name}_bearings.zip")
         rar_file_path = os.path.join(self._dataset_dir, f"{self._name}_bearings.rar")
 
         self._sample_size = 4096
-        self._signal_data = np.empty((0, self._sample_size))
-        self._labels = []
-        self._keys = []
-        
+        self._hop = None
+        self._max_windows = 1
+        self._sample_rate = None
+        self._resample_method = 'polyphase'
+        self._dtype = np.dtype(np.float32)
+        self._scale_setting = None
+        self._scale = None
+        self._signal_data = np.empty((0, self._sample_size), dtype=self._dtype)
+        self._label_codes = np.empty(0, dtype=np.int32)
+        self._file_codes = np.empty(0, dtype=np.int32)
+
         self._files_path = None
+        self._metadata = None
+        self._mat_index = None
+        self._use_cache = True
+        self._n_jobs = None
+        self._shared_memory = False
         
 
     @property
@@ -52,10 +279,267 @@ class DatasetBase(ABC):
         pass
     
     @abstractmethod
-    def load_acquisitions(self):
+    def read_file(self, key, path):
+        """
+        Decodes one file of the dataset and returns a list with the signal
+        of each recording in the file.
+        """
         pass
 
 
+    def parse_key(self, key):
+        """
+        Values of the metadata columns (see MetadataTable) described by the
+        metadata key of a file. The file column is filled in by get_metadata.
+        """
+        return {"label": key[0]}
+
+
+    def read_recordings(self, key, path):
+        """
+        Decodes one file into (signal, label code, file code) recordings.
+        The signals are cut to the samples the windows cover (see
+        limit_windows), so the rest of each recording is freed as soon as
+        its file is read instead of being kept, or sent back by a worker
+        process, until the whole dataset is segmented.
+        """
+        metadata = self.get_metadata()
+        file_code = metadata.file_code(key)
+        label_code = metadata.codes["label"][file_code]
+        signals = self.limit_windows(self.read_signals(key, path))
+        return [(signal, label_code, file_code) for signal in signals]
+
+
+    def limit_windows(self, signals):
+        """
+        Cuts the signals of one file to the samples of at most max_windows
+        windows in total, taken in order, so files with one recording per
+        channel yield as many windows as single channel files.
+        """
+        if self._max_windows is None:
+            return signals
+        limited = []
+        remaining = self._max_windows
+        for signal in signals:
+            n_windows = count_windows(len(signal), self._sample_size, self._hop, remaining)
+            if n_windows == 0:
+                continue
+            span = (n_windows - 1) * (self._hop or self._sample_size) + self._sample_size
+            limited.append(np.array(signal[:span]) if len(signal) > span else signal)
+            remaining -= n_windows
+        return limited
+
+
+    def get_source_sample_rate(self, key):
+        """
+        Native sample rate, in Hz, of the recordings in the file of the given
+        metadata key. Loaders whose files differ in rate override it.
+        """
+        return self._source_sample_rate
+
+
+    def read_signals(self, key, path):
+        """
+        Signals of one file at the target sample rate (see set_sample_rate).
+        Resampled signals are cached on disk, so each file is decoded and
+        resampled only the first time a given target rate is requested.
+        """
+        source_rate = self.get_source_sample_rate(key)
+        if self._sample_rate is None or source_rate == self._sample_rate:
+            return self.read_file(key, path)
+        if source_rate is None:
+            raise ValueError(f"The sample rate of {self._name} files is unknown.")
+
+        cache = self.get_resample_cache()
+        identity = self.get_file_identity(key, path)
+        signals = cache.load(identity, source_rate, self._sample_rate)
+        if signals is None:
+            signals = cache.resample([identity], [self.read_file(key, path)], source_rate, self._sample_rate)[0]
+        return list(signals)
+
+
+    def build_resampled(self, batch_size=16):
+        """
+        Resamples every file of the dataset to the target sample rate ahead
+        of time. Files are decoded batch_size at a time and the recordings
+        sharing a rate and a length are resampled together.
+        """
+        pending = {}
+        for key, path in self.prepare_files():
+            source_rate = self.get_source_sample_rate(key)
+            if source_rate == self._sample_rate:
+                continue
+            identity = self.get_file_identity(key, path)
+            if self.get_resample_cache().load(identity, source_rate, self._sample_rate) is None:
+                pending.setdefault(source_rate, []).append((key, path, identity))
+
+        for source_rate, files in pending.items():
+            for start in range(0, len(files), batch_size):
+                batch = files[start:start + batch_size]
+                self.get_resample_cache().resample([identity for _, _, identity in batch],
+                                                   [self.read_file(key, path) for key, path, _ in batch],
+                                                   source_rate, self._sample_rate)
+
+
+    def get_defect_frequencies(self):
+        """
+        Characteristic defect frequencies of the tested bearing, in Hz, e.g.
+        {"BPFO": ..., "BPFI": ...}, for envelope spectrum features. Empty when
+        unknown or when the shaft speed varies between recordings.
+        """
+        return dict(self._defect_frequencies)
+
+
+    def get_resample_cache(self):
+        return ResampleCache(os.path.join(self._cache_dir, "resampled"), self._resample_method)
+
+
+    def get_file_identity(self, key, path):
+        """
+        Identifies the decoded signals of a file: its key, size and
+        modification time, and the loader settings that change the decoding.
+        """
+        stat = os.stat(path)
+        return f"{key},{stat.st_size},{stat.st_mtime_ns},{self.get_source_settings()}"
+
+
+    def load_acquisitions(self, n_jobs=None, shared_memory=None):
+        """
+        Extracts the acquisitions of each file in the dictionary files_names.
+
+        With n_jobs, the files are decoded by a pool of worker processes; the
+        result is the same as the serial one. With shared_memory, the workers
+        return the decoded signals through shared memory instead of pickling them.
+        """
+        if n_jobs is None:
+            n_jobs = self._n_jobs
+        if shared_memory is None:
+            shared_memory = self._shared_memory
+
+        files = self.prepare_files()
+
+        with read_files(self.read_recordings, files, n_jobs, shared_memory) as recordings:
+            self.derive_scale(recordings)
+            self._signal_data, self._label_codes, self._file_codes = segment_recordings(
+                recordings, self._sample_size, self._max_windows, self._dtype, self._hop, self._scale)
+
+
+    def derive_scale(self, recordings):
+        """
+        Derives the scale of integer storage (see quantization_scale) from the
+        peaks of (signal, label, key) recordings of read_recordings, unless one
+        is set, so that load_acquisitions and iter_batches store the same
+        integers. recordings is not consumed for float storage.
+        """
+        if self._scale is not None:
+            return
+        self._scale = 1.0
+        if np.issubdtype(self._dtype, np.integer):
+            self._scale = quantization_scale(
+                [np.max(np.abs(signal), initial=0, keepdims=True) for signal, _, _ in recordings], self._dtype)
+
+
+    def prepare_files(self):
+        """
+        Resolves the files of the dataset and indexes their .mat headers.
+        Returns a list of (key, path) pairs.
+        """
+        self.get_metadata()
+        files = list(self._files_path.items())
+
+        # Index the .mat headers here, so worker processes receive a complete index.
+        mat_index = self.get_mat_index()
+        mat_index.update([path for _, path in files if path.endswith('.mat')])
+        mat_index.save()
+        return files
+
+
+    def get_metadata(self):
+        """
+        Metadata table of the files of the dataset, parsed once.
+        """
+        if self._metadata is None:
+            self._files_path = self.get_files_path()
+            keys = list(self._files_path)
+            fields = [dict(self.parse_key(key), file=os.path.basename(self._files_path[key])) for key in keys]
+            self._metadata = MetadataTable(keys, fields)
+        return self._metadata
+
+
+    def iter_batches(self, batch_size, shuffle=False, seed=None):
+        """
+        Yields (X_batch, y_batch, keys_batch) tuples of at most batch_size
+        segments, so feature extractors and incremental learners can process
+        datasets that do not fit in memory.
+
+        If the segments are already loaded or cached, batches are sliced from
+        them and shuffle permutes all segments. Otherwise the files are read
+        one at a time and shuffle permutes the order of the files and of the
+        segments within the pending buffer, which holds at most one file
+        plus one batch.
+        """
+        rng = np.random.default_rng(seed)
+
+        metadata = self.get_metadata()
+        label_vocabulary = metadata.vocabularies["label"]
+
+        if len(self._file_codes) > 0 or (self._use_cache and self.load_cache()):
+            order = np.arange(len(self._file_codes))
+            if shuffle:
+                order = rng.permutation(order)
+            for start in range(0, len(order), batch_size):
+                # Sorted indices read the memory mapped cache sequentially.
+                idx = np.sort(order[start:start + batch_size]) if shuffle else order[start:start + batch_size]
+                yield (np.asarray(self._signal_data[idx]), label_vocabulary[self._label_codes[idx]],
+                       metadata.keys[self._file_codes[idx]])
+            return
+
+        files = self.prepare_files()
+        if shuffle:
+            files = [files[i] for i in rng.permutation(len(files))]
+        # Integer storage needs the peak of the whole dataset: one extra decoding pass.
+        self.derive_scale(recording for key, path in files for recording in self.read_recordings(key, path))
+
+        pending = []
+        n_pending = 0
+        for key, path in files:
+            segments = segment_recordings(self.read_recordings(key, path), self._sample_size,
+                                          self._max_windows, self._dtype, self._hop, self._scale)
+            if len(segments[1]) == 0:
+                continue
+            pending.append(segments)
+            n_pending += len(segments[1])
+            if n_pending < batch_size:
+                continue
+
+            X, y, keys = (np.concatenate(arrays) for arrays in zip(*pending))
+            if shuffle:
+                order = rng.permutation(n_pending)
+                X, y, keys = X[order], y[order], keys[order]
+            n_full = n_pending - n_pending % batch_size
+            for start in range(0, n_full, batch_size):
+                yield (X[start:start + batch_size], label_vocabulary[y[start:start + batch_size]],
+                       metadata.keys[keys[start:start + batch_size]])
+            pending = [(X[n_full:], y[n_full:], keys[n_full:])]
+            n_pending -= n_full
+
+        if n_pending > 0:
+            X, y, keys = (np.concatenate(arrays) for arrays in zip(*pending))
+            if shuffle:
+                order = rng.permutation(n_pending)
+                X, y, keys = X[order], y[order], keys[order]
+            yield X, label_vocabulary[y], metadata.keys[keys]
+
+
+    def get_mat_index(self):
+        """
+        Index of the variables, shapes and classes stored in the .mat files.
+        """
+        if self._mat_index is None:
+            self._mat_index = MatIndex(os.path.join(self._cache_dir, "mat_index.json"))
+        return self._mat_index
+
+
     def get_files_path(self):
         # Files Paths ordered by bearings
         bearing_labels, bearing_names = self.get_bearings()
@@ -67,28 +551,209 @@ class DatasetBase(ABC):
 
 
     def get_bearings(self):
-        bearing_label = []
-        bearing_file_names = []
-
         with open(self._metadata_path, 'r') as fd:
             reader = csv.reader(fd)
             next(reader) # skip the first line which is the header
-            for row in reader:
-                bearing_label = np.append(bearing_label, ','.join(row))
-                bearing_file_names = np.append(bearing_file_names, row[-1])
+            rows = list(reader)
+        bearing_label = np.array([','.join(row) for row in rows])
+        bearing_file_names = np.array([row[-1] for row in rows])
         return bearing_label, bearing_file_names
 
     
     def get_acquisitions(self):
-        if len(self._labels)==0:
-            self.load_acquisitions()
-        return self._signal_data, self._labels
+        signal_data, label_codes, label_vocabulary = self.get_coded_acquisitions()
+        return signal_data, label_vocabulary[label_codes]
+
+
+    def get_coded_acquisitions(self):
+        """
+        Returns the segments, the int32 code of the label of each segment and
+        the label vocabulary the codes index.
+        """
+        if len(self._file_codes)==0:
+            if not (self._use_cache and self.load_cache()):
+                self.load_acquisitions()
+                if self._use_cache:
+                    self.save_cache()
+        return self._signal_data, self._label_codes, self.get_metadata().vocabularies["label"]
+
+
+    def get_scale(self):
+        """
+        Factor that converts the stored segments back to the source units
+        (1 unless the storage dtype is an integer type).
+        """
+        return 1.0 if self._scale is None else self._scale
+
+
+    def get_keys(self):
+        """
+        Metadata key of the file of each loaded segment.
+        """
+        return self.get_metadata().keys[self._file_codes]
+
+
+    def get_group_codes(self, column):
+        """
+        int32 code of a metadata column (e.g. "load" or "bearing") for each
+        loaded segment, for grouped splits.
+        """
+        return self.get_metadata().column_codes(column, self._file_codes)
+
+
+    def get_source_settings(self):
+        """
+        Loader settings that change the signals decoded from the files, as
+        a string. Loaders with settings of their own extend it.
+        """
+        return f"{self._loader_version}"
+
+
+    def get_settings(self):
+        """
+        Loader settings that change the decoded segments, as a string.
+        """
+        return (f"{self._sample_size},{self._hop},{self._max_windows},{self._dtype.str},{self._scale_setting},"
+                f"{self._sample_rate},{self._resample_method},{self.get_source_settings()}")
+
+
+    def get_window_span(self):
+        """
+        Number of leading samples of a recording, at the target sample rate,
+        covered by the windows. None when every window is used.
+        """
+        if self._max_windows is None:
+            return None
+        return (self._max_windows - 1) * (self._hop or self._sample_size) + self._sample_size
+
+
+    def get_required_samples(self):
+        """
+        Number of leading samples of a recording covered by the windows, so
+        loaders can skip decoding the rest. None when every window is used,
+        or when the signals are resampled, which needs the whole recording.
+        """
+        if self._sample_rate is not None:
+            return None
+        return self.get_window_span()
+
+
+    def get_cache_prefix(self):
+        """
+        Path prefix of the cached segments. It changes whenever the metadata
+        file, the segmentation settings or the loader version change.
+        """
+        digest = hashlib.sha1()
+        with open(self._metadata_path, 'rb') as fd:
+            digest.update(fd.read())
+        digest.update(self.get_settings().encode())
+        return os.path.join(self._cache_dir, f"{self._name}_{digest.hexdigest()[:16]}")
+
+
+    def load_cache(self):
+        """
+        Opens the cached segments as a read-only memory map.
+        Returns False when there is no cache for the current settings.
+        """
+        prefix = self.get_cache_prefix()
+        signals_path = f"{prefix}_signals.npy"
+        meta_path = f"{prefix}_meta.npz"
+        if not (os.path.isfile(signals_path) and os.path.isfile(meta_path)):
+            return False
+
+        with np.load(meta_path) as meta:
+            self._label_codes = meta["label_codes"]
+            self._file_codes = meta["file_codes"]
+            self._scale = float(meta["scale"])
+        self._signal_data = np.load(signals_path, mmap_mode='r')
+        return True
+
+
+    def save_cache(self):
+        """
+        Stores the decoded segments as a .npy file, plus the label and file
+        codes of the segments. The vocabularies are rebuilt from the
+        metadata file, which is part of the cache key.
+        """
+        prefix = self.get_cache_prefix()
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+        # The signals are written first: the metadata file marks a complete entry.
+        save_array(f"{prefix}_signals.npy", self._signal_data)
+        tmp_path = f"{prefix}_meta.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, label_codes=self._label_codes, file_codes=self._file_codes, scale=self.get_scale())
+        os.replace(tmp_path, f"{prefix}_meta.npz")
+
+
+    def set_use_cache(self, use_cache):
+        self._use_cache = use_cache
+
+
+    def set_n_jobs(self, n_jobs, shared_memory=False):
+        self._n_jobs = n_jobs
+        self._shared_memory = shared_memory
     
     
+    def iter_windows(self):
+        """
+        Yields (windows, label, key) for each recording, where windows is a
+        view over the decoded recording (see window_view). Copy the windows
+        before keeping them if a contiguous array is needed.
+        """
+        for key, path in self.prepare_files():
+            label = self.parse_key(key)["label"]
+            for signal in self.limit_windows(self.read_signals(key, path)):
+                yield window_view(signal, self._sample_size, self._hop, self._max_windows), label, key
+
+
+    def clear_acquisitions(self):
+        # A scale derived from the peak belongs to the previous settings.
+        self._scale = self._scale_setting
+        self._signal_data = np.empty((0, self._sample_size), dtype=self._dtype)
+        self._label_codes = np.empty(0, dtype=np.int32)
+        self._file_codes = np.empty(0, dtype=np.int32)
+
+
+    def set_dtype(self, dtype, scale=None):
+        """
+        Storage dtype of the segments, float32 by default. With an integer
+        dtype (e.g. np.int16) the segments keep ADC-like counts and
+        get_scale() converts them back; scale is derived from the peak
+        amplitude of the dataset unless given.
+        """
+        self._dtype = np.dtype(dtype)
+        self._scale_setting = scale
+        self.clear_acquisitions()
+
+
     def set_sample_size(self, sample_size):
-        self._n_samples_acquisitions = sample_size
+        self._sample_size = sample_size
+        self.clear_acquisitions()
+
+
+    def set_hop(self, hop):
+        """
+        Distance between the starts of consecutive windows. Values smaller
+        than the sample size give overlapping windows; None disables overlap.
+        """
+        self._hop = hop
+        self.clear_acquisitions()
+
+
+    def set_sample_rate(self, sample_rate, method='polyphase'):
+        """
+        Target sample rate, in Hz, of the segments (None keeps the native
+        rate of each file). method is 'polyphase' or 'decimate'; see
+        resampling.resample.
+        """
+        self._sample_rate = sample_rate
+        self._resample_method = method
+        self.clear_acquisitions()
 
 
     def set_number_of_acquisitions(self, num_acquisitions):
-        self._n_samples_acquisitions = num_acquisitions
-    
\ No newline at end of file
+        """
+        Maximum number of windows taken from each file (None for all).
+        """
+        self._max_windows = num_acquisitions
+        self.clear_acquisitions()
@@ -137,6 +137,8 @@ class HUST(DatasetBase):
     of bearing at 3 working conditions. The sample rate is 51,200 samples per second.
     """
 
+    _source_sample_rate = 51200
+
     def __init__(self):
         self._url = "https://prod-dcd-datasets-cache-zipfiles.s3.eu-west-1.amazonaws.com/cbv7jyx4p9-2.zip"        
         self._rawfilesdir = "hust_raw/HUST bearing/HUST bearing dataset"             
@@ -168,22 +170,22 @@ class HUST(DatasetBase):
             create_metadata_file(dataset_files_path, metadata_file_path)
 
 
-    def load_acquisitions(self):
+    def parse_key(self, key):
+        """
+        Keys look like "I.6208.000_W,I800.mat": the type of defect, the type
+        of bearing and the working condition.
         """
-        Extracts the acquisitions of each file in the dictionary files_names.
-        """      
+        pattern = r'\b([A-Za-z]+).(\d+).(\d+)'
 
-        cwd = os.getcwd()
+        defect, bearing, condition = re.search(pattern, key).groups()
+        return {"label": defect, "fault_element": defect, "load": condition, "bearing": bearing}
 
-        pattern = r'\b([A-Za-z]+).(\d+).(\d+)'
 
-        self._files_path = self.get_files_path()    
-        for key in self._files_path:
-            path = self._files_path[key] 
-            matlab_file = scipy.io.loadmat(path)
-            data = matlab_file["data"].reshape(1, -1)[0] [:self._sample_size]
-            defect = re.search(pattern, key).group(1)
-            self._labels = np.append(self._labels, defect)
-            self._signal_data = np.vstack((self._signal_data, data))
-            self._keys = np.append(self._keys, key)       
+    def read_file(self, key, path):
+        """
+        Extracts the acquisition of the file associated to key.
+        """
 
+        matlab_file = scipy.io.loadmat(path, variable_names=["data"])
+        data = matlab_file["data"].reshape(1, -1)[0]
+        return [data]
@@ -0,0 +1,63 @@
+"""
+Index of the variables stored in the .mat files of a dataset.
+"""
+
+import scipy.io
+import json
+import os
+
+
+class MatIndex():
+    """
+    Records, for each .mat file, the name, shape and MATLAB class of the
+    variables it holds, as reported by scipy.io.whosmat. Only the file
+    headers are read, so loaders can look up which arrays exist and pass
+    variable_names= to scipy.io.loadmat to decode just those.
+
+    The index is stored as JSON in index_path, and an entry is rebuilt when
+    the size or modification time of its file changes.
+    """
+
+    def __init__(self, index_path):
+        self._index_path = index_path
+        self._entries = {}
+        self._changed = False
+
+        if os.path.isfile(index_path):
+            with open(index_path, 'r') as fd:
+                self._entries = json.load(fd)
+
+
+    def variables(self, path):
+        """
+        Returns a dict mapping each variable name of the file to its
+        (shape, class) pair.
+        """
+        stat = os.stat(path)
+        entry = self._entries.get(path)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+            entry = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "variables": {name: [list(shape), mat_class]
+                              for name, shape, mat_class in scipy.io.whosmat(path)},
+            }
+            self._entries[path] = entry
+            self._changed = True
+        return {name: (tuple(shape), mat_class) for name, (shape, mat_class) in entry["variables"].items()}
+
+
+    def update(self, paths):
+        for path in paths:
+            self.variables(path)
+
+
+    def save(self):
+        if not self._changed:
+            return
+        os.makedirs(os.path.dirname(self._index_path) or '.', exist_ok=True)
+        tmp_path = f"{self._index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as fd:
+            json.dump(self._entries, fd)
+        os.replace(tmp_path, self._index_path)
+        self._changed = False
@@ -0,0 +1,73 @@
+"""
+Integer coded metadata of the files of a dataset.
+"""
+
+import numpy as np
+
+
+def encode(values):
+    """
+    Returns the int32 codes of values and the sorted vocabulary they index.
+    """
+    vocabulary, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return codes.astype(np.int32).reshape(-1), vocabulary
+
+
+def merge_codes(coded_values):
+    """
+    Merges (codes, vocabulary) pairs into the codes of the concatenated
+    values over the union of the vocabularies.
+    """
+    vocabulary = np.unique(np.concatenate([vocab for _, vocab in coded_values]))
+    codes = np.concatenate([np.searchsorted(vocabulary, vocab).astype(np.int32)[codes]
+                            for codes, vocab in coded_values])
+    return codes, vocabulary
+
+
+class MetadataTable():
+    """
+    Metadata of the files of a dataset, parsed once. Every column holds one
+    int32 code per file, and its vocabulary maps the codes back to values.
+
+    Segments only carry the int32 code of their file (its row in the table),
+    so relabeling and grouping are gathers over small integer arrays.
+    """
+
+    COLUMNS = ("label", "fault_element", "load", "bearing", "file")
+
+    def __init__(self, keys, fields):
+        """
+        keys : list of str
+          metadata key of each file
+        fields : list of dict
+          values of the columns of each file; missing columns are empty
+        """
+        self.keys = np.array(keys, dtype=str)
+        self._file_index = {key: np.int32(i) for i, key in enumerate(keys)}
+        self.codes = {}
+        self.vocabularies = {}
+        for column in self.COLUMNS:
+            values = [str(field.get(column, "")) for field in fields]
+            self.codes[column], self.vocabularies[column] = encode(values)
+
+
+    def __len__(self):
+        return len(self.keys)
+
+
+    def file_code(self, key):
+        return self._file_index[key]
+
+
+    def column_codes(self, column, file_codes):
+        """
+        Codes of column for the files in file_codes.
+        """
+        return self.codes[column][file_codes]
+
+
+    def decode(self, column, file_codes):
+        """
+        Values of column for the files in file_codes.
+        """
+        return self.vocabularies[column][self.codes[column][file_codes]]
@@ -140,6 +140,8 @@ class OTTAWA(DatasetBase):
     of bearing at 3 working conditions. The sample rate is 51,200 samples per second.
     """
 
+    _source_sample_rate = 42000
+
     def __init__(self):
         self._url = "https://prod-dcd-datasets-cache-zipfiles.s3.eu-west-1.amazonaws.com/y2px5tg92h-4.zip"        
         super().__init__()   
@@ -169,20 +171,23 @@ class OTTAWA(DatasetBase):
             create_metadata_file(dataset_files_path, metadata_file_path)
 
 
-    def load_acquisitions(self):
+    def parse_key(self, key):
+        """
+        Keys look like "B_14_2,B_14_2.mat": the bearing health state, the
+        bearing number and the acquisition condition.
         """
-        Extracts the acquisitions of each file in the dictionary files_names.
-        """      
-                
         pattern=r'([A-Z])_(\d+)_(\d+)'
 
-        self._files_path = self.get_files_path()
-        for key in self._files_path:
-            path = self._files_path[key]
-            matlab_file = scipy.io.loadmat(path)
-            data = matlab_file[key.split(',')[0]].reshape(1, -1)[0] [:self._sample_size]
-            label = re.search(pattern, key).group(1)
-            self._labels = np.append(self._labels, label)
-            self._signal_data = np.vstack((self._signal_data, data))
-            self._keys = np.append(self._keys, key)       
+        label, bearing, condition = re.search(pattern, key).groups()
+        return {"label": label, "fault_element": label, "load": condition, "bearing": f"{label}_{bearing}"}
+
+
+    def read_file(self, key, path):
+        """
+        Extracts the acquisition of the file associated to key.
+        """
 
+        channel = key.split(',')[0]
+        matlab_file = scipy.io.loadmat(path, variable_names=[channel])
+        data = matlab_file[channel].reshape(1, -1)[0]
+        return [data]
@@ -0,0 +1,69 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
+import os
+
+from utils.shared_arrays import share_array, attach_array, release_blocks, start_tracker
+
+
+def get_n_workers(n_jobs):
+    """
+    Number of worker processes for n_jobs, following the joblib convention
+    where negative values count back from the number of CPUs.
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(os.cpu_count() + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def read_shared(read_file, key, path):
+    """
+    Runs read_file in a worker and hands the signals back through shared
+    memory, so that only their descriptors are pickled.
+    """
+    recordings = []
+    for signal, label, recording_key in read_file(key, path):
+        block, descriptor = share_array(signal)
+        block.close()
+        recordings.append((descriptor, label, recording_key))
+    return recordings
+
+
+@contextmanager
+def read_files(read_file, files, n_jobs=None, shared_memory=False):
+    """
+    Decodes files, a list of (key, path) pairs, with read_file and yields the
+    list of (signal, label, key) recordings in the order of files, so the
+    output is the same for any n_jobs.
+
+    With shared_memory, the signals are mapped from shared memory blocks that
+    are freed when the context exits; they must be copied before that.
+    """
+    n_workers = get_n_workers(n_jobs)
+    if n_workers == 1 or len(files) <= 1:
+        yield [recording for key, path in files for recording in read_file(key, path)]
+        return
+
+    keys = [key for key, _ in files]
+    paths = [path for _, path in files]
+    recordings = []
+    blocks = []
+    if shared_memory:
+        start_tracker()
+    try:
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(files))) as executor:
+            if shared_memory:
+                for file_recordings in executor.map(read_shared, repeat(read_file), keys, paths):
+                    for descriptor, label, key in file_recordings:
+                        block, signal = attach_array(descriptor)
+                        blocks.append(block)
+                        recordings.append((signal, label, key))
+            else:
+                for file_recordings in executor.map(read_file, keys, paths):
+                    recordings.extend(file_recordings)
+        yield recordings
+    finally:
+        recordings.clear()
+        release_blocks(blocks)
@@ -0,0 +1,90 @@
+"""
+Resampling of recordings to a common sample rate, cached on disk.
+"""
+
+from fractions import Fraction
+import scipy.signal
+import numpy as np
+import hashlib
+import os
+
+from .storage import save_array
+
+
+def resample(signals, source_rate, target_rate, method='polyphase', axis=-1):
+    """
+    Resamples signals from source_rate to target_rate along axis.
+
+    method is 'polyphase' (scipy.signal.resample_poly with the rational
+    ratio of the rates) or 'decimate' (scipy.signal.decimate, which needs
+    source_rate to be an integer multiple of target_rate).
+    """
+    if source_rate == target_rate:
+        return np.asarray(signals)
+
+    if method == 'decimate':
+        factor = source_rate / target_rate
+        if factor != int(factor):
+            raise ValueError(f"Cannot decimate from {source_rate} Hz to {target_rate} Hz.")
+        return scipy.signal.decimate(signals, int(factor), axis=axis)
+
+    ratio = Fraction(target_rate / source_rate).limit_denominator(1000)
+    return scipy.signal.resample_poly(signals, ratio.numerator, ratio.denominator, axis=axis)
+
+
+class ResampleCache():
+    """
+    Stores the resampled signals of each file as one .npy file in
+    cache_dir, so they are computed once and every later load at the same
+    target rate reads them instead of decoding and resampling again.
+
+    Entries are named by a hash of the file identity (given by the loader:
+    key, file size and mtime, and the settings that change the decoded
+    signals) together with the rates and the method.
+    """
+
+    def __init__(self, cache_dir, method='polyphase'):
+        self._cache_dir = cache_dir
+        self._method = method
+
+
+    def get_path(self, identity, source_rate, target_rate):
+        digest = hashlib.sha1(f"{identity},{source_rate},{target_rate},{self._method}".encode())
+        return os.path.join(self._cache_dir, f"{digest.hexdigest()[:20]}.npy")
+
+
+    def load(self, identity, source_rate, target_rate):
+        """
+        Cached resampled signals of a file, stacked along axis 0, or None.
+        """
+        path = self.get_path(identity, source_rate, target_rate)
+        if os.path.isfile(path):
+            return np.load(path, mmap_mode='r')
+        return None
+
+
+    def resample(self, identities, files_signals, source_rate, target_rate):
+        """
+        Resamples the signals of several files and stores them. All the
+        signals with the same shape are resampled together, as one batch.
+
+        files_signals holds the list of decoded signals of each file; the
+        signals of one file must share a shape. Returns the resampled
+        signals of each file, stacked along axis 0.
+        """
+        batches = {}
+        for i, signals in enumerate(files_signals):
+            batches.setdefault(np.shape(signals[0]) if len(signals) else (), []).append(i)
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+        results = [None] * len(files_signals)
+        for indices in batches.values():
+            batch = np.concatenate([np.stack(files_signals[i]) for i in indices])
+            resampled = resample(batch, source_rate, target_rate, self._method, axis=1)
+            start = 0
+            for i in indices:
+                stop = start + len(files_signals[i])
+                results[i] = resampled[start:stop]
+                save_array(self.get_path(identities[i], source_rate, target_rate), results[i])
+                start = stop
+        return results
@@ -0,0 +1,17 @@
+"""
+Helpers for the files that loaders keep on disk.
+"""
+
+import numpy as np
+import os
+
+
+def save_array(path, array):
+    """
+    Writes array to a .npy file through a temporary file, so that readers
+    never see a partially written cache entry.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as fd:
+        np.save(fd, array)
+    os.replace(tmp_path, path)
@@ -29,6 +29,7 @@ import rarfile
 import pandas as pd
 
 from .dataset_base import DatasetBase
+from .storage import save_array
 
 
 # Code to avoid incomplete array results
@@ -173,8 +174,12 @@ class XJUT(DatasetBase):
     of bearing at 3 working conditions. The sample rate is 51,200 samples per second.
     """
 
+    _source_sample_rate = 25600
+
     def __init__(self):
         super().__init__()
+        self._channel = "Horizontal_vibration_signals"
+        self._columnar_dir = os.path.join(self._dataset_dir, "xjut_columnar")
    
 
     def download(self, target_dir=None):
@@ -209,22 +214,67 @@ class XJUT(DatasetBase):
         extract_rar(rar_file_path, dataset_files_path)
         generate_metadata(dataset_files_path, os.path.dirname(target_dir), header=["frequency", "load", "fault element", "file"])
 
+        # Binary copy of each channel, read by read_file instead of the CSV text
+        self.convert_to_columnar()
+
+
+    def parse_key(self, key):
+        """
+        Keys hold the frequency, the load, the fault element and the file.
+        """
+        frequency, load, fault_element = re.findall(r'[^,]+', key)[:3]
+        return {"label": fault_element, "fault_element": fault_element, "load": f"{frequency}{load}"}
+
 
-    def load_acquisitions(self):
+    def get_channel_path(self, path, channel):
+        """
+        Path of the binary copy of one channel of a CSV file.
         """
-        Extracts the acquisitions of each file in the dictionary files_names.
-        """   
-      
-        pattern = re.compile(r'[^,]+')
-        self._files_path = self.get_files_path()
-        print("Loading data...")
-        for key in self._files_path:
-            path = self._files_path[key]
-            df = pd.read_csv(path)
-            data_dict = {col: np.array(df[col]) for col in df.columns}
-            data = data_dict["Horizontal_vibration_signals"].reshape(1, -1)[0] [:self._sample_size]
-            label = pattern.findall(key)[2]
-            self._labels = np.append(self._labels, label)
-            self._signal_data = np.vstack((self._signal_data, data))
-            self._keys = np.append(self._keys, label)       
+        file_name = os.path.splitext(os.path.basename(path))[0]
+        return os.path.join(self._columnar_dir, f"{file_name}.{channel}.npy")
+
 
+    def convert_to_columnar(self):
+        """
+        Converts the extracted CSV files, once, into one .npy file per
+        channel, so loading reads only the requested channel and samples
+        instead of parsing the whole CSV text. Only the header of files
+        already converted is read.
+        """
+        os.makedirs(self._columnar_dir, exist_ok=True)
+        for path in self.get_files_path().values():
+            columns = pd.read_csv(path, nrows=0).columns
+            missing = [column for column in columns if not os.path.isfile(self.get_channel_path(path, column))]
+            if not missing:
+                continue
+            df = pd.read_csv(path, usecols=missing)
+            for column in missing:
+                save_array(self.get_channel_path(path, column), df[column].to_numpy())
+
+
+    def read_file(self, key, path):
+        """
+        Extracts the acquisition of the file associated to key, reading only
+        the samples covered by the windows.
+        """
+
+        n_samples = self.get_required_samples()
+        channel_path = self.get_channel_path(path, self._channel)
+        if os.path.isfile(channel_path):
+            data = np.array(np.load(channel_path, mmap_mode='r')[:n_samples])
+        else:
+            df = pd.read_csv(path, usecols=[self._channel], nrows=n_samples)
+            data = df[self._channel].to_numpy()
+        return [data]
+
+
+    def get_source_settings(self):
+        return f"{super().get_source_settings()},{self._channel}"
+
+
+    def set_channel(self, channel):
+        """
+        Vibration channel to load, e.g. "Vertical_vibration_signals".
+        """
+        self._channel = channel
+        self.clear_acquisitions()
@@ -4,7 +4,6 @@ Class definition of Ottawa Bearing dataset download and acquisitions extraction.
 
 import urllib.request
 import scipy.io
-import scipy.signal
 import numpy as np
 import os
 from sklearn.model_selection import KFold, GroupKFold, StratifiedShuffleSplit
@@ -15,6 +14,8 @@ import sys
 # Unpack Tools
 from pyunpack import Archive
 
+from datasets.models.dataset_base import CodedLabels
+
 # Code to avoid incomplete array results
 np.set_printoptions(threshold=sys.maxsize)
 
@@ -61,7 +62,7 @@ def extract_zip(dirname, zip_name):
         extract_zip(dirname, zip_name)
 
 
-class Ottawa():
+class Ottawa(CodedLabels):
     """
     Ottawa class wrapper for database download and acquisition.
 
@@ -84,12 +85,13 @@ class Ottawa():
     load_acquisitions()
       Extract data from files
     """
-    def __init__(self, downsample = False):
+    def __init__(self, downsample = False, dtype=np.float32):
         self.rawfilesdir = "ottawa_raw"
         self.url="https://md-datasets-cache-zipfiles-prod.s3.eu-west-1.amazonaws.com/v43hmbwxpm-1.zip"
 
         self.n_folds = 4
         self.dsample = downsample
+        self.sample_rate = 200000
 
         if self.dsample:
             #self.sample_size = 8192
@@ -100,9 +102,10 @@ class Ottawa():
 
         self.n_samples_acquisition = 100  # used for FaultNet
 
-        self.signal_data = np.empty((0, self.sample_size))
-        self.labels = []
-        self.keys = []
+        self.set_dtype(dtype)
+        self.signal_data = np.empty((0, self.sample_size), dtype=self.dtype)
+        if self.dsample:
+            self.set_sample_rate(self.sample_rate // 16, method='decimate')
 
         """
         Ottawa data set description.
@@ -172,27 +175,31 @@ class Ottawa():
 
         print("Dataset Loaded.")
 
+    def get_source_sample_rate(self, key):
+        return self.sample_rate
+
+    def read_file(self, key):
+        matlab_file = scipy.io.loadmat(self.files[key], variable_names=['Channel_1'])
+
+        vibration_data = np.ravel(matlab_file['Channel_1'])
+        #vibration_data = np.array([elem for singleList in matlab_file['Channel_1'][0:15000] for elem in singleList])
+        print(len(vibration_data))
+        return [vibration_data]
+
     def load_acquisitions(self):
         """
-        Extracts the acquisitions of each file in the dictionary files_names.
+        Extracts the acquisitions of each file in the dictionary files_names,
+        at the target sample rate (see set_sample_rate; downsample decimates
+        by 16). The resampled recordings are cached, so each file is
+        resampled only once.
         """
-
+        recordings = []
         for key in self.files:
             print(key)
-            matlab_file = scipy.io.loadmat(self.files[key])
+            vibration_data = self.read_resampled(key, self.files[key], lambda: self.read_file(key))[0]
+            recordings.append((vibration_data, key[0], key))
 
-            vibration_data = np.array([elem for singleList in matlab_file['Channel_1'] for elem in singleList])
-            #vibration_data = np.array([elem for singleList in matlab_file['Channel_1'][0:15000] for elem in singleList])
-            print(len(vibration_data))
-            if self.dsample:
-                vibration_data = scipy.signal.decimate(vibration_data, 16)
-                print(len(vibration_data))
-
-            for i in range(len(vibration_data)//self.sample_size):
-                sample = vibration_data[(i * self.sample_size):((i + 1) * self.sample_size)]
-                self.signal_data = np.append(self.signal_data, np.array([sample]), axis=0)
-                self.labels = np.append(self.labels, key[0])
-                self.keys = np.append(self.keys, key)
+        self.segment(recordings)
 
     def kfold(self):
 
@@ -221,10 +228,7 @@ class Ottawa():
         if len(self.signal_data) == 0:
             self.load_acquisitions()
 
-        groups = []
-
-        for i in self.keys:
-            groups = np.append(groups, i)
+        groups = self.key_codes
 
         kf = GroupKFold(n_splits=self.n_folds)
 
@@ -237,9 +241,8 @@ class Ottawa():
         if len(self.signal_data) == 0:
             self.load_acquisitions()
 
-        groups = []
-        for i in self.keys:
-            groups = np.append(groups, i[2])
+        settings = np.array([key[2] for key in self.key_vocabulary])
+        groups = settings[self.key_codes]
 
         #print(groups)
 
@@ -18,6 +18,9 @@ import socket
 # Unpack Tools
 from pyunpack import Archive
 
+from datasets.models.dataset_base import CodedLabels
+from datasets.models.parallel import read_files
+
 # Code to avoid incomplete array results
 np.set_printoptions(threshold=sys.maxsize)
 
@@ -71,7 +74,7 @@ def extract_rar(dirname, dir_rar, bearing):
         extract_rar(dirname, dir_rar, bearing)
 
 
-class Paderborn():
+class Paderborn(CodedLabels):
     """
     Paderborn class wrapper for database download and acquisition.
 
@@ -108,7 +111,7 @@ class Paderborn():
 
         return bearing_names
 
-    def __init__(self, bearing_names_file="paderborn_bearings.csv", n_aquisitions=20):
+    def __init__(self, bearing_names_file="paderborn_bearings.csv", n_aquisitions=20, dtype=np.float32):
         self.rawfilesdir = "paderborn_raw"
         self.url = "http://groups.uni-paderborn.de/kat/BearingDataCenter/"
         self.n_folds = 4
@@ -118,9 +121,8 @@ class Paderborn():
         self.bearing_names = self.get_paderborn_bearings()
         self.n_acquisitions = n_aquisitions
 
-        self.signal_data = np.empty((0,self.sample_size))
-        self.labels = []
-        self.keys = []
+        self.set_dtype(dtype)
+        self.signal_data = np.empty((0,self.sample_size), dtype=self.dtype)
 
         """
         Associate each file name to a bearing condition in a Python dictionary. 
@@ -193,24 +195,34 @@ class Paderborn():
 
         print("Dataset Loaded.")
 
-    def load_acquisitions(self):
+    def get_source_sample_rate(self, key):
+        return 64000
+
+    def read_vibration(self, path):
+        if len(path) > 41:
+            variable = path[19:38]
+        else:
+            variable = path[19:37]
+        matlab_file = scipy.io.loadmat(os.path.join(os.getcwd(), path), variable_names=[variable])
+        vibration_data = matlab_file[variable]['Y'][0][0][0][6][2]
+        return [vibration_data[0]]
+
+    def read_file(self, key, path):
+        """
+        Extracts the acquisition of the file associated to key, at the target
+        sample rate (see set_sample_rate).
+        """
+        print("Loading vibration data:", key)
+        acquisition = self.read_resampled(key, path, lambda: self.read_vibration(path))[0]
+        #self.n_samples_acquisition = len(acquisition)//self.sample_size
+        return [(acquisition, key[0], key)]
+
+    def load_acquisitions(self, n_jobs=None, shared_memory=False):
         """
         Extracts the acquisitions of each file in the dictionary files_names.
+
+        With n_jobs, the files are decoded by a pool of worker processes; the
+        result is the same as the serial one.
         """
-        cwd = os.getcwd()
-        for key in self.files:
-            print("Loading vibration data:", key)
-            matlab_file = scipy.io.loadmat(os.path.join(cwd, self.files[key]))
-            if len(self.files[key]) > 41:
-                vibration_data = matlab_file[self.files[key][19:38]]['Y'][0][0][0][6][2]
-            else:
-                vibration_data = matlab_file[self.files[key][19:37]]['Y'][0][0][0][6][2]
-
-            acquisition = vibration_data[0]
-            #self.n_samples_acquisition = len(acquisition)//self.sample_size
-            for i in range(self.n_samples_acquisition):
-                sample = acquisition[(i * self.sample_size):((i + 1) * self.sample_size)]
-                self.signal_data = np.append(self.signal_data, np.array([sample]), axis=0)
-                self.labels = np.append(self.labels, key[0])
-                self.keys = np.append(self.keys, key)
-                    
\ No newline at end of file
+        with read_files(self.read_file, list(self.files.items()), n_jobs, shared_memory) as recordings:
+            self.segment(recordings, self.n_samples_acquisition)
@@ -0,0 +1,118 @@
+
+import numpy as np
+import hashlib
+import os
+from sklearn.base import TransformerMixin
+from datasets.models.storage import save_array
+
+def fingerprint(X, chunk_size=1024):
+  '''
+  BLAKE2b digest of the shape, dtype and contents of X. The rows are
+  hashed chunk_size at a time, so memory mapped inputs are not copied.
+  '''
+  X = np.asarray(X)
+  digest = hashlib.blake2b(digest_size=20)
+  digest.update(f"{X.shape},{X.dtype.str}".encode())
+  for start in range(0, len(X), chunk_size):
+    digest.update(np.ascontiguousarray(X[start:start+chunk_size]).data)
+  return digest.hexdigest()
+
+def describe(obj):
+  '''
+  Stable description of an extractor, its parameters and what it learned
+  in fit, recursing into nested extractors, whose default repr holds a
+  memory address. Arrays are described by their fingerprint.
+
+  Extractor classes take part in the cache keys through two class
+  attributes: _version, to bump whenever the features they compute change
+  so that features cached by older versions are not reused, and
+  _runtime_params, the parameters (e.g. n_jobs) that do not change the
+  features and are left out. The extractors a class combines
+  (get_extractors) are described too.
+  '''
+  if isinstance(obj, np.ndarray):
+    return fingerprint(obj)
+  if isinstance(obj, dict):
+    return "{" + ", ".join(f"{key!r}: {describe(value)}" for key, value in sorted(obj.items())) + "}"
+  if isinstance(obj, (list, tuple)):
+    return "[" + ", ".join(describe(value) for value in obj) + "]"
+  if isinstance(obj, type) or not (hasattr(obj, "get_params") or hasattr(obj, "__dict__")):
+    return repr(obj)
+  if hasattr(obj, "get_params"):
+    # sklearn estimators: the parameters and the fitted attributes (trailing _).
+    params = obj.get_params(deep=False)
+    params.update({key: value for key, value in vars(obj).items() if key.endswith("_") and not key.startswith("_")})
+  else:
+    params = dict(vars(obj))
+  runtime_params = getattr(obj, "_runtime_params", ())
+  params = {key: value for key, value in params.items() if key not in runtime_params}
+  if hasattr(obj, "get_extractors"):
+    params["extractors"] = obj.get_extractors()
+  name = f"{type(obj).__module__}.{type(obj).__qualname__}"
+  if hasattr(obj, "_version"):
+    name = f"{name}/v{obj._version}"
+  return f"{name}({describe(params)})"
+
+def evict(cache_dir, max_bytes, keep=None):
+  '''
+  Removes the least recently used .npy files of cache_dir until their
+  total size is at most max_bytes. The file keep (e.g. the entry just
+  written) is never removed.
+  '''
+  entries = []
+  for entry in os.scandir(cache_dir):
+    if entry.name.endswith('.npy') and entry.path != keep:
+      stat = entry.stat()
+      entries.append((stat.st_mtime, stat.st_size, entry.path))
+  total = sum(size for _, size, _ in entries)
+  if keep is not None and os.path.isfile(keep):
+    total += os.path.getsize(keep)
+  for _, size, path in sorted(entries):
+    if total <= max_bytes:
+      break
+    try:
+      os.remove(path)
+    except FileNotFoundError: # evicted by another process
+      pass
+    total -= size
+
+class CachedTransformer(TransformerMixin):
+  '''
+  Wraps a feature extractor and keeps its output on disk, so the features
+  of the same segments are computed only once across classifiers and
+  experiments.
+
+  The entries are keyed by a fingerprint of the input array together with
+  the class, the version and the parameters of the extractor (see
+  describe). Once the files of cache_dir exceed max_bytes, the least
+  recently used ones are removed; features larger than max_bytes are
+  not stored.
+  '''
+  def __init__(self, transformer, cache_dir=os.path.join("cache", "features"), max_bytes=2**30):
+    self.transformer = transformer
+    self.cache_dir = cache_dir
+    self.max_bytes = max_bytes
+  def fit(self, X, y=None):
+    self.transformer.fit(X, y)
+    return self
+  def get_feature_names(self, n_channels=None):
+    return self.transformer.get_feature_names(n_channels)
+  def get_key(self, X):
+    settings = hashlib.blake2b(describe(self.transformer).encode(), digest_size=8)
+    return f"{type(self.transformer).__name__.lower()}_{settings.hexdigest()}_{fingerprint(X)}"
+  def transform(self, X, y=None):
+    path = os.path.join(self.cache_dir, f"{self.get_key(X)}.npy")
+    if os.path.isfile(path):
+      try:
+        features = np.load(path)
+        os.utime(path) # mark the entry as recently used
+        return features
+      except FileNotFoundError: # evicted by another process
+        pass
+    features = self.transformer.transform(X)
+    if features.nbytes > self.max_bytes:
+      return features
+    os.makedirs(self.cache_dir, exist_ok=True)
+    save_array(path, features)
+    evict(self.cache_dir, self.max_bytes, keep=path)
+    return features
@@ -0,0 +1,88 @@
+
+import numpy as np
+import scipy.fft
+from sklearn.base import TransformerMixin
+from features_extractors.statisticaltime import as_floating, channel_feature_names
+from features_extractors.statisticalfrequency import real_spectrum
+from features_extractors.intermediates import Intermediates
+
+def envelope_spectrum(X, workers=None, spectrum=None):
+  '''
+  One-sided magnitude spectrum of the envelope of each row of X along
+  axis 1 (the time axis of (n, len) and channel-last (n, len, channels)
+  input). The envelope is the magnitude of the analytic signal, built as
+  scipy.signal.hilbert does, but from the real FFT of the whole matrix:
+  one rfft, one ifft and one rfft for all rows. Keeps float32.
+
+  spectrum is the real FFT of X (real_spectrum), when already computed;
+  it is not modified.
+  '''
+  X = as_floating(X)
+  n = X.shape[1]
+  if spectrum is None:
+    spectrum = real_spectrum(X, workers)
+  else:
+    spectrum = spectrum.copy()
+  # Analytic signal: doubled positive frequencies, no negative frequencies.
+  spectrum[:, 1:(n+1)//2] *= 2
+  analytic = scipy.fft.ifft(spectrum, n=n, axis=1, workers=workers)
+  envelope = np.absolute(analytic)
+  envelope -= np.mean(envelope, axis=1, keepdims=True)
+  return np.absolute(scipy.fft.rfft(envelope, axis=1, workers=workers)) / n
+
+def band_masks(n, sample_rate, frequencies, tolerance):
+  '''
+  Boolean masks, one per frequency, of the bins of the one-sided spectrum
+  of n samples within frequency*(1 +- tolerance), and at least the
+  nearest bin.
+  '''
+  bins = scipy.fft.rfftfreq(n, 1/sample_rate)
+  resolution = sample_rate / n
+  masks = np.zeros((len(frequencies), len(bins)), dtype=bool)
+  for i, frequency in enumerate(frequencies):
+    half_width = max(frequency*tolerance, resolution/2)
+    masks[i] = np.abs(bins - frequency) <= half_width
+  return masks
+
+class EnvelopeSpectrum(TransformerMixin):
+  '''
+  Extracts the energy of the envelope spectrum around the bearing defect
+  frequencies and their harmonics.
+
+  defect_frequencies maps a name (e.g. "BPFO") to a frequency in Hz,
+  usually the dataset's get_defect_frequencies(). Each feature is the
+  square root of the energy of the envelope spectrum bins within tolerance
+  (relative) of a harmonic, so the block has len(defect_frequencies)*harmonics
+  columns per channel.
+  '''
+  _version = 1
+  _runtime_params = ("workers",)
+  def __init__(self, sample_rate, defect_frequencies, harmonics=3, tolerance=0.03, workers=None):
+    self.sample_rate = sample_rate
+    self.defect_frequencies = defect_frequencies
+    self.harmonics = harmonics
+    self.tolerance = tolerance
+    self.workers = workers
+  def fit(self, X, y=None):
+    return self
+  def get_bands(self):
+    return [(f"{name}_{h}x", h*frequency) for name, frequency in self.defect_frequencies.items()
+            for h in range(1, self.harmonics+1)]
+  def transform(self, X, y=None):
+    return self.transform_intermediates(Intermediates(as_floating(X)))
+  def transform_intermediates(self, shared):
+    '''
+    Features of the block of segments of shared (an Intermediates), reusing
+    its real FFT if another extractor (e.g. StatisticalFrequency) already
+    computed it.
+    '''
+    X = shared.X
+    rfft = shared.get("rfft", lambda X: real_spectrum(X, self.workers))
+    spectrum = envelope_spectrum(X, self.workers, rfft)
+    masks = band_masks(X.shape[1], self.sample_rate, [frequency for _, frequency in self.get_bands()], self.tolerance)
+    # The band energies of every row, band and channel in one product: (n, [channels,] bands).
+    energy = np.tensordot(np.square(spectrum), masks.T.astype(spectrum.dtype), axes=([1], [0]))
+    energy = np.sqrt(np.moveaxis(energy, -1, 1))
+    return energy.reshape((len(X), -1)).astype(X.dtype, copy=False)
+  def get_feature_names(self, n_channels=None):
+    return channel_feature_names([name for name, _ in self.get_bands()], n_channels)
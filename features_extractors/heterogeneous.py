@@ -1,21 +1,47 @@
 
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.base import TransformerMixin
-from features_extractors.statisticaltime import StatisticalTime
+from features_extractors.statisticaltime import StatisticalTime, as_floating
 from features_extractors.statisticalfrequency import StatisticalFrequency
 from features_extractors.wavelet import WaveletPackage
+from features_extractors.intermediates import Intermediates
+from datasets.models.parallel import get_n_workers
 
 class Heterogeneous(TransformerMixin):
   '''
   Extracts statistical features from both time and frequency domain.
+
+  The rows are processed in blocks of block_size segments. Within a block
+  the extractors share their intermediates (see Intermediates), and with
+  n_jobs the blocks are processed by a pool of threads; numpy, scipy.fft
+  and pywt release the GIL while they compute.
+
+  envelope optionally adds the features of an EnvelopeSpectrum extractor.
   '''
+  _version = 1
+  _runtime_params = ("n_jobs", "block_size")
+  def __init__(self, n_jobs=None, block_size=512, envelope=None):
+    self.n_jobs = n_jobs
+    self.block_size = block_size
+    self.envelope = envelope
   def fit(self, X, y=None):
     return self
+  def get_extractors(self):
+    extractors = [StatisticalTime(), StatisticalFrequency(), WaveletPackage()]
+    if self.envelope is not None:
+      extractors.append(self.envelope)
+    return extractors
+  def get_feature_names(self, n_channels=None):
+    return [name for extractor in self.get_extractors() for name in extractor.get_feature_names(n_channels)]
+  def transform_block(self, X):
+    shared = Intermediates(X)
+    return np.concatenate([extractor.transform_intermediates(shared) for extractor in self.get_extractors()], axis=1)
   def transform(self, X, y=None):
-    st = StatisticalTime()
-    stfeats = st.transform(X)
-    sf = StatisticalFrequency()
-    sffeats = sf.transform(X)
-    wp = WaveletPackage()
-    wpfeats = wp.transform(X)
-    return np.concatenate((stfeats, sffeats, wpfeats), axis=1)
+    X = as_floating(X)
+    blocks = [X[start:start+self.block_size] for start in range(0, len(X), self.block_size)]
+    n_workers = min(get_n_workers(self.n_jobs), len(blocks))
+    if n_workers <= 1:
+      return np.concatenate([self.transform_block(block) for block in blocks])
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+      return np.concatenate(list(executor.map(self.transform_block, blocks)))
@@ -0,0 +1,20 @@
+
+class Intermediates():
+  '''
+  Arrays derived from one block of segments, such as the mean square or
+  the real FFT. Each one is computed the first time an extractor asks for
+  it and is shared with the extractors that ask for it afterwards: the
+  mean square of StatisticalTime and StatisticalFrequency, and the real
+  FFT of StatisticalFrequency and EnvelopeSpectrum.
+  '''
+  def __init__(self, X):
+    self.X = X
+    self._values = {}
+  def get(self, name, compute):
+    '''
+    Returns the intermediate called name, computing it as compute(X) on the
+    first request.
+    '''
+    if name not in self._values:
+      self._values[name] = compute(self.X)
+    return self._values[name]
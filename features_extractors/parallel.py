@@ -0,0 +1,74 @@
+
+import numpy as np
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.base import TransformerMixin
+from datasets.models.parallel import get_n_workers
+from utils.shared_arrays import share_array, attach_array, release_blocks, start_tracker
+
+# State of a worker process: the wrapped transformer and the shared input.
+_worker = {}
+
+def share_input(X):
+  '''
+  Makes X available to worker processes without pickling it. Arrays
+  memory mapped from a file (e.g. the segment caches of the loaders) are
+  mapped again by the workers; other arrays are copied once into shared
+  memory. Returns the shared memory blocks to release and the descriptor
+  the workers attach to.
+  '''
+  if isinstance(X, np.memmap) and isinstance(X.base, mmap.mmap) and X.filename:
+    return [], ("memmap", (X.filename, X.offset, X.shape, X.dtype.str, X.flags.f_contiguous))
+  block, descriptor = share_array(X)
+  return [block], ("shared", descriptor)
+
+def attach_input(descriptor):
+  kind, descriptor = descriptor
+  if kind == "memmap":
+    filename, offset, shape, dtype, fortran = descriptor
+    return None, np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape,
+                           order='F' if fortran else 'C')
+  return attach_array(descriptor)
+
+def init_worker(transformer, descriptor):
+  _worker["block"], _worker["X"] = attach_input(descriptor)
+  _worker["transformer"] = transformer
+
+def transform_rows(start, stop):
+  return _worker["transformer"].transform(_worker["X"][start:stop])
+
+class ParallelTransformer(TransformerMixin):
+  '''
+  Runs the transform of a feature extractor over blocks of block_size rows
+  in a pool of n_jobs worker processes (joblib convention: -1 uses every
+  CPU). The input is shared with the workers through shared memory, or
+  through its file when it is memory mapped, and only the row ranges and
+  the features are sent between processes. The blocks are put back in
+  order, so the result is the same as the serial transform.
+  '''
+  _runtime_params = ("n_jobs", "block_size")
+  def __init__(self, transformer, n_jobs=None, block_size=1024):
+    self.transformer = transformer
+    self.n_jobs = n_jobs
+    self.block_size = block_size
+  def fit(self, X, y=None):
+    self.transformer.fit(X, y)
+    return self
+  def get_feature_names(self, n_channels=None):
+    return self.transformer.get_feature_names(n_channels)
+  def transform(self, X, y=None):
+    starts = list(range(0, len(X), self.block_size))
+    n_workers = min(get_n_workers(self.n_jobs), len(starts))
+    if n_workers <= 1:
+      return self.transformer.transform(X)
+
+    blocks, descriptor = share_input(X)
+    if blocks:
+      start_tracker()
+    try:
+      with ProcessPoolExecutor(max_workers=n_workers, initializer=init_worker,
+                               initargs=(self.transformer, descriptor)) as executor:
+        stops = [start + self.block_size for start in starts]
+        return np.concatenate(list(executor.map(transform_rows, starts, stops)))
+    finally:
+      release_blocks(blocks)
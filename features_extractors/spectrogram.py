@@ -0,0 +1,81 @@
+
+import numpy as np
+import scipy.signal
+import os
+import mmap
+from features_extractors.statisticaltime import as_floating
+from features_extractors.cached import fingerprint, evict
+
+def stft_magnitude(X, nperseg=64, noverlap=None, window='hann'):
+  '''
+  Magnitude of the short-time Fourier transform of each row of X, for the
+  whole matrix in one call. Returns an array of shape (n, frequencies,
+  frames) (keeps float32).
+  '''
+  _, _, Z = scipy.signal.stft(as_floating(X), window=window, nperseg=nperseg, noverlap=noverlap, axis=1)
+  return np.absolute(Z)
+
+class SpectrogramStore():
+  '''
+  Computes the STFT magnitudes of whole datasets in batches of batch_size
+  segments and stores them as memory mapped .npy files in cache_dir
+  (float16 by default), so repeated experiments read the time-frequency
+  tensors instead of computing them again.
+
+  Entries are keyed by the STFT parameters, the storage dtype and a key
+  for the segments: the name of the dataset and its settings (e.g. the
+  base name of DatasetBase.get_cache_prefix()) or, by default, the file
+  of segments memory mapped from a dataset cache, or else a fingerprint
+  of the segments. Once the files of cache_dir exceed max_bytes, the
+  least recently used ones are removed (see cached.evict).
+  '''
+  def __init__(self, cache_dir=os.path.join("cache", "spectrograms"), nperseg=64, noverlap=None,
+               window='hann', dtype=np.float16, batch_size=512, max_bytes=2**32):
+    self.cache_dir = cache_dir
+    self.nperseg = nperseg
+    self.noverlap = noverlap
+    self.window = window
+    self.dtype = np.dtype(dtype)
+    self.batch_size = batch_size
+    self.max_bytes = max_bytes
+  def get_key(self, X):
+    '''
+    Key of segments given without one: the name, size and modification
+    time of the dataset cache file X is memory mapped from, or a
+    fingerprint of X.
+    '''
+    if isinstance(X, np.memmap) and isinstance(X.base, mmap.mmap) and X.filename:
+      stat = os.stat(X.filename)
+      name = os.path.splitext(os.path.basename(X.filename))[0]
+      return f"{name}_{stat.st_size}_{stat.st_mtime_ns}"
+    return fingerprint(X)
+  def get_path(self, X, key=None):
+    if key is None:
+      key = self.get_key(X)
+    settings = f"{self.nperseg}_{self.noverlap}_{self.window}_{self.dtype.str.lstrip('<>|=')}"
+    return os.path.join(self.cache_dir, f"{key}_stft_{settings}.npy")
+  def transform(self, X, key=None):
+    '''
+    Returns the STFT magnitudes of the segments X, shape (n, frequencies,
+    frames), as a read-only memory map, computing and storing them first
+    if needed.
+    '''
+    path = self.get_path(X, key)
+    if os.path.isfile(path):
+      try:
+        os.utime(path) # mark the entry as recently used
+        return np.load(path, mmap_mode='r')
+      except FileNotFoundError: # evicted by another process
+        pass
+    os.makedirs(self.cache_dir, exist_ok=True)
+    shape = stft_magnitude(X[:1], self.nperseg, self.noverlap, self.window).shape[1:]
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    store = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=self.dtype, shape=(len(X),) + shape)
+    for start in range(0, len(X), self.batch_size):
+      store[start:start+self.batch_size] = stft_magnitude(X[start:start+self.batch_size],
+                                                          self.nperseg, self.noverlap, self.window)
+    store.flush()
+    del store
+    os.replace(tmp_path, path)
+    evict(self.cache_dir, self.max_bytes, keep=path)
+    return np.load(path, mmap_mode='r')
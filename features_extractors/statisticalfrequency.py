@@ -1,22 +1,146 @@
 
 import numpy as np
+import scipy.fft
 from sklearn.base import TransformerMixin
-from features_extractors.statisticaltime import rms
+from features_extractors.statisticaltime import as_floating, channel_feature_names, mean_square
+
+def real_spectrum(X, workers=None):
+  '''
+  Real FFT of each row of X along axis 1, the time axis of (n, len) and
+  channel-last (n, len, channels) input (keeps float32). workers is the
+  number of FFT threads, as in scipy.fft (-1 uses every CPU).
+  '''
+  return scipy.fft.rfft(as_floating(X), axis=1, workers=workers)
+
+def magnitude_spectrum(X, workers=None):
+  '''
+  One-sided magnitude spectrum of each row of X (see real_spectrum).
+  '''
+  return np.absolute(real_spectrum(X, workers))
+
+def spectrum_weights(n):
+  '''
+  Number of bins of the full spectrum of a real signal of n samples that
+  each bin of its one-sided spectrum stands for: the negative frequencies
+  mirror the positive ones, except for the DC and Nyquist bins.
+  '''
+  weights = np.full(n//2 + 1, 2)
+  weights[0] = 1
+  if n % 2 == 0:
+    weights[-1] = 1
+  return weights
+
+def spectrum_features(fx, n, power=None):
+  '''
+  Frequency center, RMS and root variance frequency of the full spectra
+  of the rows (and channels) of a matrix, given their one-sided magnitude
+  spectrum fx along axis 1 and the number of samples n of the FFT.
+
+  power, the mean square of the signals the spectra come from, gives the
+  RMS by Parseval's theorem (sum |X|^2 = n^2 * power) instead of a sum
+  over the spectrum.
+  '''
+  weights = spectrum_weights(n).astype(fx.dtype).reshape((-1,) + (1,)*(fx.ndim-2))
+  fc = np.sum(fx*weights, axis=1) / n # frequency center
+  if power is None:
+    rmsf = np.sqrt(np.sum(np.square(fx)*weights, axis=1) / n)
+  else:
+    rmsf = np.sqrt(n*power)
+  return np.stack([
+                  fc, # frequency center
+                  rmsf, # RMS from the frequency domain
+                  np.sqrt(np.sum(np.square(fx-fc[:, np.newaxis])*weights, axis=1) / n), # Root Variance Frequency
+                  ], axis=1).reshape((len(fx), -1)).astype(fx.dtype, copy=False)
+
+class RunningSpectrum():
+  '''
+  Running average of the one-sided magnitude spectra of consecutive,
+  non-overlapping frames of nfft samples of a recording given in chunks.
+  Samples left over at the end of a chunk are carried over to the next
+  one, so frames do not depend on how the recording is chunked. Batches
+  of frames are merged into the average with Welford's update, and two
+  accumulators can be merged the same way.
+  '''
+  def __init__(self, nfft=4096, workers=None):
+    self.nfft = nfft
+    self.workers = workers
+    self.count = 0
+    self.mean = 0.0
+    self._pending = None
+  def update(self, chunk):
+    chunk = as_floating(chunk)
+    if self._pending is not None:
+      chunk = np.concatenate((self._pending, chunk))
+    n_frames = len(chunk) // self.nfft
+    self._pending = chunk[n_frames*self.nfft:].copy()
+    if n_frames > 0:
+      frames = chunk[:n_frames*self.nfft].reshape((n_frames, self.nfft) + chunk.shape[1:])
+      spectra = magnitude_spectrum(frames, self.workers).astype(np.float64)
+      self._merge(n_frames, np.mean(spectra, axis=0))
+    return self
+  def _merge(self, count, mean):
+    total = self.count + count
+    self.mean = self.mean + (mean - self.mean) * (count / total)
+    self.count = total
+  def merge(self, other):
+    '''
+    Adds the frames averaged by other to this accumulator. Samples other
+    holds back for an incomplete frame are dropped.
+    '''
+    if other.count > 0:
+      self._merge(other.count, other.mean)
+    return self
+  def features(self):
+    '''
+    The StatisticalFrequency features of the averaged spectrum, in the
+    same order and with the same (feature, channel) layout.
+    '''
+    if self.count == 0:
+      raise ValueError(f"The recording is shorter than one frame of {self.nfft} samples.")
+    return spectrum_features(self.mean[np.newaxis], self.nfft)[0]
 
 class StatisticalFrequency(TransformerMixin):
   '''
   Extracts statistical features from the frequency domain.
+
+  The features are those of the full magnitude spectrum, computed from
+  the one-sided spectrum of a real FFT over all rows at once. Channel-last
+  input gives the features of each channel (see get_feature_names).
   '''
+  FEATURES = ["fc", "rmsf", "rvf"]
+  _version = 2
+  _runtime_params = ("workers",)
+  def __init__(self, workers=None):
+    self.workers = workers
   def fit(self, X, y=None):
     return self
   def transform(self, X, y=None):
-    sig = []
-    for x in X[:]:
-      fx = np.absolute(np.fft.fft(x)) # transform x from time to frequency domain
-      fc = np.mean(fx) # frequency center
-      sig.append([
-                  fc, # frequency center
-                  rms(fx), # RMS from the frequency domain
-                  rms(fx-fc), # Root Variance Frequency
-                  ])
-    return np.array(sig)
+    return self.transform_spectrum(X)[0]
+  def transform_intermediates(self, shared):
+    '''
+    Features of the block of segments of shared (an Intermediates), reusing
+    its mean square (StatisticalTime) and its real FFT (EnvelopeSpectrum)
+    if another extractor already computed them.
+    '''
+    fx = np.absolute(shared.get("rfft", lambda X: real_spectrum(X, self.workers)))
+    return spectrum_features(fx, shared.X.shape[1], shared.get("mean_square", mean_square))
+  def transform_spectrum(self, X):
+    '''
+    Returns the features and the one-sided magnitude spectrum they were
+    computed from, so other extractors can reuse it.
+    '''
+    X = as_floating(X)
+    fx = magnitude_spectrum(X, self.workers) # transform x from time to frequency domain
+    return spectrum_features(fx, X.shape[1], mean_square(X)), fx
+  def transform_stream(self, chunks, nfft=4096):
+    '''
+    Features of the average magnitude spectrum of the frames of nfft
+    samples of a whole recording given as an iterable of chunks (see
+    iter_chunks). Returns one row of features.
+    '''
+    spectrum = RunningSpectrum(nfft, self.workers)
+    for chunk in chunks:
+      spectrum.update(chunk)
+    return spectrum.features()
+  def get_feature_names(self, n_channels=None):
+    return channel_feature_names(self.FEATURES, n_channels)
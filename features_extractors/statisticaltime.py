@@ -2,6 +2,39 @@
 import numpy as np
 import scipy.stats as stats
 from sklearn.base import TransformerMixin
+from features_extractors.intermediates import Intermediates
+
+
+def as_floating(X):
+    '''
+    Returns X as a floating point array without upcasting float32 data.
+    Integer data (e.g. int16 ADC counts) is converted to float32.
+    '''
+    X = np.asarray(X)
+    if not np.issubdtype(X.dtype, np.floating):
+        X = X.astype(np.float32)
+    return X
+
+
+def iter_chunks(signal, chunk_size=2**20):
+    '''
+    Yields consecutive chunks of chunk_size samples of a recording of shape
+    (len,) or (len, channels). For memory mapped recordings (e.g. the .npy
+    caches of the loaders) only the chunk being processed is read.
+    '''
+    for start in range(0, len(signal), chunk_size):
+        yield np.asarray(signal[start:start+chunk_size])
+
+
+def channel_feature_names(names, n_channels=None):
+    '''
+    Column names of features computed per channel: the features of channel
+    c are suffixed with _ch<c>, in the order extractors lay out channel-last
+    input, (feature, channel). Without channels the names are unchanged.
+    '''
+    if n_channels is None:
+        return list(names)
+    return [f"{name}_ch{channel}" for name in names for channel in range(n_channels)]
 
 
 def rms(x):
@@ -68,30 +101,186 @@ def kf(x):
     return stats.kurtosis(x)/(np.mean(x**2)**2)
 
 
+def mean_square(X):
+    '''
+    Mean square (power) of each row (and channel) of X along axis 1.
+    '''
+    return np.mean(np.square(X), axis=1)
+
+
+def central_moment_features(T):
+    '''
+    Kurtosis (Fisher) and skewness of each row (and channel) of T, along
+    axis 1, computed as scipy.stats.kurtosis and scipy.stats.skew do for a
+    single row but sharing the deviations from the mean between both.
+    '''
+    mean = np.mean(T, axis=1, keepdims=True)
+    deviation = T - mean
+    deviation_square = deviation**2
+    m2 = np.mean(deviation_square, axis=1)
+    m3 = np.mean(deviation_square*deviation, axis=1)
+    m4 = np.mean(deviation_square**2, axis=1)
+    with np.errstate(all='ignore'):
+        constant = m2 <= (np.finfo(m2.dtype).eps*np.squeeze(mean, axis=1))**2
+        kurtosis = np.where(constant, np.nan, m4/(m2*m2)) - 3
+        skewness = np.where(constant, np.nan, m3/(m2*np.sqrt(m2)))
+    return kurtosis, skewness
+
+
+class RunningMoments():
+    '''
+    Running statistics of a recording given in chunks along axis 0: count,
+    mean, central moments up to the 4th, extremes and the sums behind the
+    time domain features. Chunks are merged with the pairwise update of
+    Chan et al. and Pebay, which stays accurate for long recordings, and
+    two accumulators can be merged the same way (e.g. one per worker).
+    All accumulators are float64 and per channel.
+    '''
+    def __init__(self):
+        self.count = 0
+        self.mean = self.m2 = self.m3 = self.m4 = 0.0
+        self.maximum = -np.inf
+        self.minimum = np.inf
+        self.sum_absolute = self.sum_sqrt_absolute = self.sum_square = 0.0
+
+    def update(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if len(chunk) == 0:
+            return self
+        other = RunningMoments()
+        other.count = len(chunk)
+        other.mean = np.mean(chunk, axis=0)
+        deviation = chunk - other.mean
+        deviation_square = deviation**2
+        other.m2 = np.sum(deviation_square, axis=0)
+        other.m3 = np.sum(deviation_square*deviation, axis=0)
+        other.m4 = np.sum(deviation_square**2, axis=0)
+        other.maximum = np.max(chunk, axis=0)
+        other.minimum = np.min(chunk, axis=0)
+        absolute = np.absolute(chunk)
+        other.sum_absolute = np.sum(absolute, axis=0)
+        other.sum_sqrt_absolute = np.sum(np.sqrt(absolute), axis=0)
+        other.sum_square = np.sum(np.square(chunk), axis=0)
+        return self.merge(other)
+
+    def merge(self, other):
+        '''
+        Adds the samples summarized by other to this accumulator.
+        '''
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        delta_n = delta / n
+        m2 = self.m2 + other.m2 + delta*delta_n*na*nb
+        m3 = (self.m3 + other.m3 + delta*delta_n**2*na*nb*(na-nb)
+              + 3*delta_n*(na*other.m2 - nb*self.m2))
+        m4 = (self.m4 + other.m4 + delta*delta_n**3*na*nb*(na*na - na*nb + nb*nb)
+              + 6*delta_n**2*(na*na*other.m2 + nb*nb*self.m2) + 4*delta_n*(na*other.m3 - nb*self.m3))
+        self.count = n
+        self.mean = self.mean + nb*delta_n
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        self.maximum = np.maximum(self.maximum, other.maximum)
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.sum_absolute = self.sum_absolute + other.sum_absolute
+        self.sum_sqrt_absolute = self.sum_sqrt_absolute + other.sum_sqrt_absolute
+        self.sum_square = self.sum_square + other.sum_square
+        return self
+
+    def variance(self):
+        return self.m2 / self.count
+
+    def features(self):
+        '''
+        The StatisticalTime features of the samples seen so far, in the same
+        order and with the same (feature, channel) layout.
+        '''
+        n = self.count
+        m2, m3, m4 = self.m2/n, self.m3/n, self.m4/n
+        with np.errstate(all='ignore'):
+            constant = m2 <= (np.finfo(np.float64).eps*self.mean)**2
+            kurtosis = np.where(constant, np.nan, m4/m2**2) - 3
+            skewness = np.where(constant, np.nan, m3/m2**1.5)
+            mean_absolute = self.sum_absolute / n
+            mean_square = self.sum_square / n
+            root_mean_square = np.sqrt(mean_square)
+            square_root_amplitude = (self.sum_sqrt_absolute / n)**2
+            peak = np.maximum(np.absolute(self.maximum), np.absolute(self.minimum))
+            return np.stack(np.broadcast_arrays(
+                root_mean_square,  # root mean square
+                square_root_amplitude,  # square root amplitude
+                kurtosis,  # kurtosis
+                skewness,  # skewness
+                self.maximum-self.minimum,  # peak to peak value
+                peak/root_mean_square,  # crest factor
+                peak/mean_absolute,  # impact factor
+                peak/square_root_amplitude,  # margin factor
+                root_mean_square/mean_absolute,  # shape factor
+                kurtosis/mean_square**2,  # kurtosis factor
+            )).reshape(-1)
+
+
 class StatisticalTime(TransformerMixin):
     '''
     Extracts statistical features from the time domain.
+
+    Channel-last input, (n, len, channels), gives the features of each
+    channel (see get_feature_names).
     '''
 
+    FEATURES = ["rms", "sra", "kurtosis", "skewness", "ppv", "cf", "ifa", "mf", "sf", "kf"]
+
+    _version = 3
+
     def fit(self, X, y=None):
         return self
 
     def transform(self, X, y=None):
-        if len(X.shape)>2:
-            T = X.reshape((X.shape[0],X.shape[1]*X.shape[2]))
-        else:
-            T = X
-        return np.array([
-            [
-                rms(x),  # root mean square
-                sra(x),  # square root amplitude
-                stats.kurtosis(x),  # kurtosis
-                stats.skew(x),  # skewness
-                ppv(x),  # peak to peak value
-                cf(x),  # crest factor
-                ifa(x),  # impact factor
-                mf(x),  # margin factor
-                sf(x),  # shape factor
-                kf(x),  # kurtosis factor
-            ] for x in T[:]
-        ])
+        return self.transform_intermediates(Intermediates(as_floating(X)))
+
+    def transform_intermediates(self, shared):
+        '''
+        Features of the block of segments of shared (an Intermediates),
+        reusing the intermediates other extractors already computed.
+        '''
+        T = shared.X
+        # Every feature is computed for all rows (and channels) at once along
+        # the time axis; the intermediate arrays are shared between the
+        # features that use them.
+        absolute = np.absolute(T)
+        peak = np.max(absolute, axis=1)
+        mean_absolute = np.mean(absolute, axis=1)
+        power = shared.get("mean_square", mean_square)
+        root_mean_square = np.sqrt(power)
+        square_root_amplitude = np.square(np.mean(np.sqrt(absolute), axis=1))
+        kurtosis, skewness = central_moment_features(T)
+        return np.stack([
+            root_mean_square,  # root mean square
+            square_root_amplitude,  # square root amplitude
+            kurtosis,  # kurtosis
+            skewness,  # skewness
+            np.max(T, axis=1)-np.min(T, axis=1),  # peak to peak value
+            peak/root_mean_square,  # crest factor
+            peak/mean_absolute,  # impact factor
+            peak/square_root_amplitude,  # margin factor
+            root_mean_square/mean_absolute,  # shape factor
+            kurtosis/np.square(power),  # kurtosis factor
+        ], axis=1).reshape((len(T), -1)).astype(T.dtype, copy=False)
+
+    def transform_stream(self, chunks):
+        '''
+        Features of a whole recording given as an iterable of chunks (see
+        iter_chunks), from running moments, so the recording never has to
+        be held in memory. Returns one row of features.
+        '''
+        moments = RunningMoments()
+        for chunk in chunks:
+            moments.update(chunk)
+        return moments.features()
+
+    def get_feature_names(self, n_channels=None):
+        return channel_feature_names(self.FEATURES, n_channels)
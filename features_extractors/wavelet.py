@@ -2,21 +2,48 @@
 import numpy as np
 from sklearn.base import TransformerMixin
 import pywt
+from features_extractors.statisticaltime import as_floating, channel_feature_names
+from features_extractors.intermediates import Intermediates
+
+def leaf_coefficients(X, wavelet='db4', mode='symmetric', maxlevel=4):
+  '''
+  Wavelet packet decomposition of every row of X at once, along axis 1
+  (the time axis of (n, len) and channel-last (n, len, channels) input).
+  Each level filters all the nodes of the previous level in one call.
+  Returns the leaf coefficients with shape (n, 2**maxlevel, len', ...),
+  with the leaves in natural (frequency path) order.
+  '''
+  nodes = X[:, np.newaxis]
+  for _ in range(maxlevel):
+    approximation, detail = pywt.dwt(nodes, wavelet, mode=mode, axis=2)
+    # Interleave the children so each node is followed by its sibling.
+    nodes = np.stack((approximation, detail), axis=2)
+    nodes = nodes.reshape((nodes.shape[0], -1) + nodes.shape[3:])
+  return nodes
 
 class WaveletPackage(TransformerMixin):
   '''
   Extracts Wavelet Package features.
   The features are calculated by the energy of the recomposed signal
-  of the leaf nodes coefficients.
+  of the leaf nodes coefficients. Channel-last input gives the features
+  of each channel (see get_feature_names).
   '''
+  FEATURES = [f"wp{-k % 16}" for k in range(16)]
+  _version = 1
   def fit(self, X, y=None):
     return self
   def transform(self, X, y=None):
-    def Energy(coeffs, k):
-      return np.sqrt(np.sum(np.array(coeffs[-k]) ** 2)) / len(coeffs[-k])
-    def getEnergy(wp):
-      coefs = np.asarray([n.data for n in wp.get_leaf_nodes(True)])
-      return np.asarray([Energy(coefs,i) for i in range(2**wp.maxlevel)])
-    return np.array([getEnergy(pywt.WaveletPacket(data=x, wavelet='db4',
-                                                  mode='symmetric', maxlevel=4)
-                                                  ) for x in X[:]])
\ No newline at end of file
+    return self.transform_intermediates(Intermediates(as_floating(X)))
+  def transform_intermediates(self, shared):
+    '''
+    Features of the block of segments of shared (an Intermediates), reusing
+    its wavelet packet leaves if another extractor already computed them.
+    '''
+    X = shared.X
+    coefs = shared.get("packet_leaves", leaf_coefficients)
+    energy = np.sqrt(np.sum(coefs ** 2, axis=2)) / coefs.shape[2]
+    # The features are ordered as the leaves -k for k = 0, 1, ..., 2**maxlevel-1.
+    order = -np.arange(coefs.shape[1]) % coefs.shape[1]
+    return energy[:, order].reshape((len(X), -1)).astype(X.dtype, copy=False)
+  def get_feature_names(self, n_channels=None):
+    return channel_feature_names(self.FEATURES, n_channels)
@@ -19,6 +19,10 @@ from datasets.models.cwru import CWRU
 from datasets.models.hust import HUST
 from datasets.models.ottawa import OTTAWA
 from datasets.models.xjut import XJUT
+from datasets.models.metadata import merge_codes
+from features_extractors.parallel import share_input, attach_input
+from utils.shared_arrays import release_blocks, start_tracker
+from utils.pipeline_prefixes import transform_shared_prefixes
 
 from imblearn.combine import SMOTEENN, SMOTETomek
 from imblearn.under_sampling import RandomUnderSampler
@@ -29,6 +33,7 @@ def write_in_file(file_name, message):
         file.write(message)
 
 import time
+import queue
 import functools
 
 
@@ -51,35 +56,149 @@ def run_train_test(classifier, X_train, y_train, X_test):
     return y_pred
 
 
+def evaluate(name, classifier, X_train, y_train, X_test, y_test):
+    """
+    Trains and tests one classifier. Returns its metrics and run time.
+    """
+    start_time = time.perf_counter()
+    y_pred = run_train_test(classifier, X_train, y_train, X_test)
+    labels = list(set(y_train).union(set(y_test)))
+    return {"name": name,
+            "accuracy": accuracy_score(y_test, y_pred),
+            "f1-score": f1_score(y_test, y_pred, average='macro'),
+            "labels": labels,
+            "confusion_matrix": confusion_matrix(y_test, y_pred, labels=labels),
+            "time": time.perf_counter() - start_time}
+
+
+def evaluate_worker(index, name, classifier, train_descriptor, y_train, test_descriptor, y_test, results):
+    """
+    Runs evaluate in a worker process on the training and test segments
+    shared by the parent, and puts (index, metrics, error) on results.
+    """
+    train_block, X_train = attach_input(train_descriptor)
+    test_block, X_test = attach_input(test_descriptor)
+    try:
+        results.put((index, evaluate(name, classifier, X_train, y_train, X_test, y_test), None))
+    except Exception as error:
+        results.put((index, None, f"{type(error).__name__}: {error}"))
+    finally:
+        del X_train, X_test
+        release_blocks([block for block in (train_block, test_block) if block is not None], unlink=False)
+
+
+def evaluate_parallel(prepared, y_train, y_test):
+    """
+    Evaluates every (name, classifier, X_train, X_test) of prepared in its
+    own process. Each distinct input array is shared once through shared
+    memory (or its memory mapped cache file) instead of being copied to
+    each process, and the metrics come back over Q, so the wall time is
+    that of the slowest classifier.
+    """
+    blocks = []
+    descriptors = {}
+    workers = []
+    start_tracker()
+    try:
+        for _, _, X_train, X_test in prepared:
+            for X in (X_train, X_test):
+                if id(X) not in descriptors:
+                    array_blocks, descriptors[id(X)] = share_input(X)
+                    blocks.extend(array_blocks)
+        workers = [Process(target=evaluate_worker,
+                           args=(index, name, classifier, descriptors[id(X_train)], y_train,
+                                 descriptors[id(X_test)], y_test, Q))
+                   for index, (name, classifier, X_train, X_test) in enumerate(prepared)]
+        for worker in workers:
+            worker.start()
+        results = [None] * len(prepared)
+        remaining = set(range(len(prepared)))
+        exited = set()
+        while remaining:
+            try:
+                index, metrics, error = Q.get(timeout=1)
+            except queue.Empty:
+                # A worker that exited without a result (killed, crashed) is
+                # reported once its result could no longer be in transit.
+                lost = exited.intersection(remaining)
+                if lost:
+                    index = min(lost)
+                    raise RuntimeError(f"{prepared[index][0]} failed: worker exited with code "
+                                       f"{workers[index].exitcode} without a result")
+                exited = {index for index in remaining if workers[index].exitcode is not None}
+                continue
+            if error is not None:
+                raise RuntimeError(f"{prepared[index][0]} failed: {error}")
+            results[index] = metrics
+            remaining.discard(index)
+        for worker in workers:
+            worker.join()
+        return results
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+        release_blocks(blocks)
+
+
+def report(metrics):
+    print("\n", metrics["name"])
+    print(f"accuracy: {metrics['accuracy']}")
+    print(f"f1-score: {metrics['f1-score']}")
+    print(metrics["labels"])
+    print(metrics["confusion_matrix"])
+    print(f"time: {metrics['time']:.2f} s")
+
+
+def report_sharing(stats):
+    print(f"\nShared pipeline steps: ran {stats['run']} of {stats['requested']} transformer steps "
+          f"in {stats['time']:.2f} s, saving about {stats['saved']:.2f} s.")
+
+
+def to_source_units(X, scale):
+    """
+    Segments stored as integers (see set_dtype) as float32 in the source
+    units, so the features do not depend on the storage dtype.
+    """
+    if np.issubdtype(X.dtype, np.integer) and scale != 1.0:
+        return np.multiply(X, scale, dtype=np.float32)
+    return X
+
+
 def get_acquisitions(dataset, domain, healthy_labels=['N', 'H']):
-    X, y = None, None
+    X, codes, vocabulary = None, None, None
 
     if len(dataset) == 1:
-        X, y = dataset[0][1].get_acquisitions()
+        X, codes, vocabulary = dataset[0][1].get_coded_acquisitions()
+        X = to_source_units(X, dataset[0][1].get_scale())
     else:
-        X, y = merge_datasets(dataset)
+        X, codes, vocabulary = merge_datasets(dataset)
     
     print(f"### {domain}: ", ', '.join([data[0] for data in dataset]), "###")
-    y = np.where(np.isin(y, healthy_labels), 'N', 'F')
-    print(f"Labels: {set(y)}")
-    for label in set(y):
-        print((f"{label}: {np.sum(y==label)}"))
+    # Relabel the vocabulary, then gather: no string comparisons per segment.
+    healthy = np.isin(vocabulary, healthy_labels)[codes]
+    y = np.where(healthy, 'N', 'F')
+    n_healthy = np.count_nonzero(healthy)
+    counts = {label: count for label, count in [('N', n_healthy), ('F', len(y) - n_healthy)] if count > 0}
+    print(f"Labels: {set(counts)}")
+    for label, count in counts.items():
+        print((f"{label}: {count}"))
     
     return X, y
 
 
 def merge_datasets(datasets):
-    X1, y1 = datasets[0][1].get_acquisitions()
-    X2, y2 = datasets[1][1].get_acquisitions()
-    
-    y1 = np.append(y1, y2)
-    X1 = np.vstack((X1, X2))
+    acquisitions = [data[1].get_coded_acquisitions() for data in datasets]
+    scales = [data[1].get_scale() for data in datasets]
 
-    return X1, y1
+    codes, vocabulary = merge_codes([(codes, vocabulary) for _, codes, vocabulary in acquisitions])
+    X = np.concatenate([to_source_units(X, scale) for (X, _, _), scale in zip(acquisitions, scales)])
+
+    return X, codes, vocabulary
 
 
 @timer
-def experimenter(source, target, clfs):
+def experimenter(source, target, clfs, parallel=False, share_prefixes=True):
 
     write_in_file("execution_time", f"{target[0][0]}\n")
 
@@ -88,14 +207,20 @@ def experimenter(source, target, clfs):
     X_train, y_train = get_acquisitions(source, 'Source')       
     X_test, y_test = get_acquisitions(target, 'Target')
     
-    for clf in clfs:
-        y_pred = run_train_test(clf[1], X_train, y_train, X_test)
-        print("\n", clf[0])
-        print(f"accuracy: {accuracy_score(y_test, y_pred)}")
-        print(f"f1-score: {f1_score(y_test, y_pred, average='macro')}")
-        labels = list(set(y_train).union(set(y_test)))
-        print(labels)
-        print(confusion_matrix(y_test, y_pred, labels=labels))
+    # With share_prefixes, pipelines starting with the same steps compute
+    # them once and the final estimators receive their outputs.
+    prepared = [(name, classifier, X_train, X_test) for name, classifier in clfs]
+    if share_prefixes:
+        prepared, stats = transform_shared_prefixes(clfs, X_train, y_train, X_test)
+        report_sharing(stats)
+
+    if parallel:
+        for metrics in evaluate_parallel(prepared, y_train, y_test):
+            report(metrics)
+        return
+
+    for name, classifier, X_train_clf, X_test_clf in prepared:
+        report(evaluate(name, classifier, X_train_clf, y_train, X_test_clf, y_test))
 
 
 def main():
@@ -136,6 +261,13 @@ def main():
         # ('XJUT', XJUT())
     ]
 
+    # Common sample rate, in Hz, of the source and target segments, so that
+    # datasets recorded at different rates are compared like with like.
+    sample_rate = None # e.g. 12000
+    if sample_rate is not None:
+        for _, dataset in source + target:
+            dataset.set_sample_rate(sample_rate)
+
 
     # hust[1].download()
     # CWRU().download(dirname="datasets/data/cwru_raw", metadata_path="datasets/data/cwru_raw/cwru_bearings.csv")
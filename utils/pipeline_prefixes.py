@@ -0,0 +1,51 @@
+from sklearn.pipeline import Pipeline
+import time
+
+from features_extractors.cached import describe
+
+
+def split_pipeline(classifier):
+    '''
+    Transformer steps and final estimator of a classifier. A classifier
+    that is not a Pipeline has no transformer steps.
+    '''
+    if isinstance(classifier, Pipeline):
+        steps = [step for _, step in classifier.steps[:-1] if step not in (None, 'passthrough')]
+        return steps, classifier.steps[-1][1]
+    return [], classifier
+
+
+def transform_shared_prefixes(clfs, X_train, y_train, X_test):
+    '''
+    Runs the transformer steps of the pipelines in clfs, a list of (name,
+    classifier) pairs, once per distinct prefix of steps: pipelines that
+    start with equal steps (same class and parameters, see describe) share
+    the train and test outputs of those steps.
+
+    Returns the list of (name, final estimator, train input, test input) in
+    the order of clfs, and the statistics of the deduplication: the steps
+    requested by the pipelines and those actually run, and the time spent
+    and saved, estimated from the time of each step that was run.
+    '''
+    outputs = {(): (X_train, X_test)}
+    uses = {}
+    times = {}
+    prepared = []
+    for name, classifier in clfs:
+        steps, estimator = split_pipeline(classifier)
+        key = ()
+        for step in steps:
+            train, test = outputs[key]
+            key = key + (describe(step),)
+            uses[key] = uses.get(key, 0) + 1
+            if key not in outputs:
+                start_time = time.perf_counter()
+                outputs[key] = (step.fit_transform(train, y_train), step.transform(test))
+                times[key] = time.perf_counter() - start_time
+        prepared.append((name, estimator) + outputs[key])
+
+    stats = {"requested": sum(uses.values()),
+             "run": len(times),
+             "time": sum(times.values()),
+             "saved": sum((uses[key] - 1) * times[key] for key in times)}
+    return prepared, stats
@@ -0,0 +1,45 @@
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+
+def start_tracker():
+    '''
+    Starts the shared memory resource tracker in the parent process, so
+    that worker processes created afterwards report to it instead of
+    starting their own trackers, which would free blocks handed back to
+    the parent when the workers exit.
+    '''
+    resource_tracker.ensure_running()
+
+
+def share_array(array):
+    '''
+    Copies array into a new shared memory block.
+    Returns the block and a picklable descriptor of the shared array.
+    '''
+    array = np.asarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def attach_array(descriptor):
+    '''
+    Maps the shared array described by descriptor without copying it.
+    Returns the block and the array.
+    '''
+    name, shape, dtype = descriptor
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def release_blocks(blocks, unlink=True):
+    '''
+    Closes the shared memory blocks and, if unlink, frees them.
+    Every array mapped on a block must have been released before.
+    '''
+    for block in blocks:
+        block.close()
+        if unlink:
+            block.unlink()